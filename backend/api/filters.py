@@ -1,7 +1,9 @@
 import django_filters
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Exists, F, OuterRef
 from django_filters import filters
 
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.models import SEARCH_CONFIG, Ingredient, Recipe, RecipeTag, Tag
 
 
 class IngredientFilter(django_filters.FilterSet):
@@ -22,13 +24,15 @@ class RecipeFilter(django_filters.FilterSet):
     )
     is_favorited = filters.NumberFilter(method='get_favorited')
     is_in_shopping_cart = filters.NumberFilter(method='get_in_shopping_cart')
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
         fields = ('author',
                   'tags',
                   'is_favorited',
-                  'is_in_shopping_cart')
+                  'is_in_shopping_cart',
+                  'search')
 
     def get_favorited(self, queryset, name, value):
         user = getattr(self.request, 'user', None)
@@ -43,6 +47,28 @@ class RecipeFilter(django_filters.FilterSet):
         return queryset
 
     def filter_tags_or(self, queryset, name, value):
+        """
+        Оставляет рецепты хотя бы с одним из тегов. Коррелированный
+        EXISTS по индексу (recipe, tag) не размножает строки, поэтому
+        DISTINCT не нужен и сортировка по -id остаётся индексной.
+        """
         if value:
-            return queryset.filter(tags__in=value).distinct()
+            return queryset.filter(Exists(RecipeTag.objects.filter(
+                recipe=OuterRef('pk'),
+                tag_id__in=[tag.pk for tag in value],
+            )))
         return queryset
+
+    def filter_search(self, queryset, name, value):
+        """
+        Полнотекстовый поиск по названию и описанию по GIN-индексу
+        search_vector; результаты упорядочены по релевантности.
+        """
+        query = SearchQuery(
+            value, config=SEARCH_CONFIG, search_type='websearch'
+        )
+        return (
+            queryset.filter(search_vector=query)
+            .annotate(search_rank=SearchRank(F('search_vector'), query))
+            .order_by('-search_rank', '-id')
+        )
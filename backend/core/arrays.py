@@ -0,0 +1,16 @@
+from typing import Tuple
+
+import numpy as np
+
+
+def sorted_lookup(
+    sorted_values: np.ndarray, values: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Ищет значения в отсортированном массиве. Возвращает позиции
+    (как np.searchsorted) и маску найденных значений.
+    """
+    positions = np.searchsorted(sorted_values, values)
+    found = positions < len(sorted_values)
+    found[found] = sorted_values[positions[found]] == values[found]
+    return positions, found
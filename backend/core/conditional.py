@@ -0,0 +1,123 @@
+import hashlib
+
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.versioning import (
+    get_versions,
+    versions_shared,
+    viewer_version_name,
+)
+
+
+class NotModified(Exception):
+    """Ответ клиента не изменился: вместо тела отдаётся 304."""
+
+
+def _strip_weak(etag: str) -> str:
+    """Убирает признак слабого валидатора для сравнения ETag."""
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def etag_matches(etag: str, header: str) -> bool:
+    """
+    Проверяет ETag по заголовку If-None-Match (слабое сравнение).
+
+    Слабое сравнение нужно потому, что CompressionMiddleware
+    помечает ETag сжатых ответов как W/.
+    """
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    candidates = {_strip_weak(tag.strip()) for tag in header.split(',')}
+    return _strip_weak(etag) in candidates
+
+
+class ConditionalGetMixin:
+    """
+    Условные GET-запросы для ViewSet по версиям наборов данных.
+
+    ETag строится до выполнения обработчика из пути с параметрами,
+    формата ответа и счётчиков версий (core.versioning), поэтому при
+    совпадении If-None-Match ответ 304 отдаётся без запросов к БД
+    и сериализации. Если ответ зависит от пользователя, в ETag входят
+    его id и версия его состояния (избранное, покупки, подписки).
+
+    Без общего для процессов кеша (versions_shared) ETag не выдаётся:
+    воркер, не видевший увеличения версии, ответил бы 304 на изменённые
+    данные.
+    """
+
+    etag_actions = ('list', 'retrieve')
+    etag_versions = ()
+    etag_per_user = False
+
+    def get_etag_versions(self):
+        """Возвращает имена версий, от которых зависит ответ."""
+        return self.etag_versions
+
+    def get_etag(self, request):
+        """
+        Вычисляет ETag текущего запроса без построения ответа.
+        """
+        names = list(self.get_etag_versions())
+        user_id = None
+        if self.etag_per_user and request.user.is_authenticated:
+            user_id = request.user.pk
+            names.append(viewer_version_name(user_id))
+        versions = get_versions(names)
+        parts = [
+            request.get_full_path(),
+            request.accepted_renderer.format,
+            user_id,
+            *(versions[name] for name in names),
+        ]
+        digest = hashlib.md5(
+            '|'.join(map(str, parts)).encode('utf-8')
+        ).hexdigest()
+        return f'"{digest}"'
+
+    def initial(self, request, *args, **kwargs):
+        """
+        Проверяет If-None-Match после аутентификации и прав доступа.
+        """
+        super().initial(request, *args, **kwargs)
+        self.etag = None
+        if request.method not in ('GET', 'HEAD'):
+            return
+        if self.action not in self.etag_actions or not versions_shared():
+            return
+        self.etag = self.get_etag(request)
+        if etag_matches(self.etag, request.META.get('HTTP_IF_NONE_MATCH')):
+            raise NotModified
+
+    def handle_exception(self, exc):
+        """Превращает NotModified в пустой ответ 304."""
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """
+        Добавляет ETag и Cache-Control: no-cache, чтобы кеши (в том числе
+        nginx) хранили ответ и перепроверяли его по ETag. Ответы
+        для авторизованных пользователей помечаются как private.
+        """
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        etag = getattr(self, 'etag', None)
+        if etag and response.status_code in (
+            status.HTTP_200_OK,
+            status.HTTP_304_NOT_MODIFIED,
+        ):
+            response['ETag'] = etag
+            if self.etag_per_user:
+                patch_vary_headers(response, ('Authorization',))
+            if self.etag_per_user and request.user.is_authenticated:
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(response, public=True, no_cache=True)
+        return response
@@ -0,0 +1,113 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+COUNT_CACHE_PREFIX = 'pagination:count'
+
+
+def _cache_key(queryset) -> str:
+    """
+    Строит ключ кеша по SQL запроса и его параметрам.
+
+    SQL уже содержит все применённые фильтры (включая зависящие
+    от пользователя), поэтому одинаковые наборы фильтров дают один ключ.
+    """
+    sql, params = queryset.order_by().query.sql_with_params()
+    digest = hashlib.md5(
+        f'{queryset.db}|{sql}|{params!r}'.encode('utf-8')
+    ).hexdigest()
+    return f'{COUNT_CACHE_PREFIX}:{digest}'
+
+
+def _table_estimate(queryset, ttl):
+    """
+    Возвращает оценку числа строк таблицы из pg_class.reltuples.
+
+    Значение меняется медленно, поэтому тоже кешируется.
+    """
+    table = queryset.model._meta.db_table
+    key = f'{COUNT_CACHE_PREFIX}:reltuples:{queryset.db}:{table}'
+    estimate = cache.get(key)
+    if estimate is not None:
+        return estimate
+
+    connection = connections[queryset.db]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [table],
+        )
+        row = cursor.fetchone()
+    estimate = int(row[0]) if row and row[0] is not None else -1
+    cache.set(key, estimate, ttl)
+    return estimate
+
+
+def _plan_estimate(queryset):
+    """
+    Возвращает оценку числа строк запроса по плану EXPLAIN.
+    """
+    connection = connections[queryset.db]
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def estimate_count(queryset, threshold, ttl):
+    """
+    Возвращает оценку планировщика PostgreSQL или None.
+
+    Оценка не используется, пока вся таблица меньше порога: тогда
+    точный подсчёт дёшев. Для запроса без фильтров берётся статистика
+    таблицы, для отфильтрованного — оценка строк из EXPLAIN.
+    """
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    table_rows = _table_estimate(queryset, ttl)
+    if table_rows < threshold:
+        return None
+    if not queryset.query.where:
+        return table_rows
+    return _plan_estimate(queryset)
+
+
+def get_count(queryset):
+    """
+    Возвращает пару (количество, is_estimated) для пагинации.
+
+    Небольшие наборы считаются точно через COUNT(*). Если планировщик
+    оценивает набор не меньше PAGINATION_COUNT_ESTIMATE_THRESHOLD строк,
+    возвращается оценка. Точные подсчёты больших наборов (не меньше
+    PAGINATION_COUNT_CACHE_THRESHOLD) и оценки кешируются на
+    PAGINATION_COUNT_CACHE_TTL секунд по ключу набора фильтров.
+    """
+    key = _cache_key(queryset)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    ttl = getattr(settings, 'PAGINATION_COUNT_CACHE_TTL', 30)
+    estimate_threshold = getattr(
+        settings, 'PAGINATION_COUNT_ESTIMATE_THRESHOLD', 100_000
+    )
+    cache_threshold = getattr(
+        settings, 'PAGINATION_COUNT_CACHE_THRESHOLD', 1_000
+    )
+
+    estimate = estimate_count(queryset, estimate_threshold, ttl)
+    if estimate is not None and estimate >= estimate_threshold:
+        result = (estimate, True)
+        cache.set(key, result, ttl)
+        return result
+
+    result = (queryset.count(), False)
+    if result[0] >= cache_threshold:
+        cache.set(key, result, ttl)
+    return result
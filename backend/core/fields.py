@@ -0,0 +1,62 @@
+FIELDS_QUERY_PARAM = 'fields'
+OMIT_QUERY_PARAM = 'omit'
+FIELDS_CONTEXT_KEY = 'fields'
+
+
+def _split(values):
+    """Разбирает значения вида 'a,b' из нескольких параметров."""
+    return {
+        name.strip()
+        for value in values
+        for name in value.split(',')
+        if name.strip()
+    }
+
+
+def get_requested_fields(request, available):
+    """
+    Возвращает кортеж полей, выбранных параметрами ?fields= и ?omit=.
+
+    Поля возвращаются в порядке available; неизвестные имена
+    игнорируются, поле id сохраняется всегда. Если параметры
+    не переданы, возвращает None — то есть все поля.
+    """
+    if request is None:
+        return None
+    params = request.query_params
+    fields = _split(params.getlist(FIELDS_QUERY_PARAM))
+    omit = _split(params.getlist(OMIT_QUERY_PARAM))
+    if not fields and not omit:
+        return None
+    return tuple(
+        name for name in available
+        if name == 'id'
+        or ((not fields or name in fields) and name not in omit)
+    )
+
+
+class SparseFieldsMixin:
+    """
+    Оставляет у корневого сериализатора только поля из контекста.
+
+    Кортеж полей передаётся в context['fields'] (см. get_requested_fields);
+    вложенные сериализаторы не затрагиваются.
+    """
+
+    def get_fields(self):
+        """Отбрасывает поля, не выбранные в запросе."""
+        fields = super().get_fields()
+        selected = self.context.get(FIELDS_CONTEXT_KEY)
+        if selected is None or not self._is_root_item():
+            return fields
+        return {
+            name: field for name, field in fields.items()
+            if name in selected
+        }
+
+    def _is_root_item(self):
+        """Проверяет, что сериализатор — корень ответа или его элемент."""
+        parent = self.parent
+        if parent is None:
+            return True
+        return parent.parent is None and getattr(parent, 'many', False)
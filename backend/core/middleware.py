@@ -0,0 +1,123 @@
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - зависит от окружения
+    brotli = None
+
+# Только ответы API: HTML-страницы админки с CSRF-токенами не сжимаются,
+# чтобы не открывать их для атак BREACH.
+COMPRESSIBLE_CONTENT_TYPES = ('application/json',)
+# Случайное дополнение gzip, как в GZipMiddleware Django.
+GZIP_MAX_RANDOM_BYTES = 100
+
+
+def _accepted_encodings(header):
+    """
+    Возвращает множество кодировок из Accept-Encoding с ненулевым q.
+    """
+    accepted = set()
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name and quality > 0:
+            accepted.add(name)
+    return accepted
+
+
+def _brotli_sequence(sequence):
+    """Сжимает поток фрагментов brotli по мере их поступления."""
+    compressor = brotli.Compressor()
+    for item in sequence:
+        data = compressor.process(item)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    Сжимает JSON-ответы API brotli или gzip.
+
+    Алгоритм выбирается по Accept-Encoding: brotli, если клиент его
+    принимает и установлен пакет brotli, иначе gzip. Ответы меньше
+    API_COMPRESSION_MIN_SIZE байт не сжимаются; потоковые ответы
+    сжимаются по мере генерации.
+
+    gzip дополняется случайным числом байт, как в GZipMiddleware,
+    что затрудняет атаку BREACH. У brotli такого дополнения нет;
+    от BREACH его защищает только то, что сжимается лишь JSON API:
+    HTML с CSRF-токенами не сжимается, а токен авторизации отдаётся
+    только в коротком ответе входа, который меньше порога сжатия.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'API_COMPRESSION_MIN_SIZE', 1024)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        return self.process_response(request, response)
+
+    def _choose_encoding(self, request):
+        """Выбирает алгоритм сжатия, поддерживаемый клиентом."""
+        accepted = _accepted_encodings(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if brotli is not None and 'br' in accepted:
+            return 'br'
+        if 'gzip' in accepted:
+            return 'gzip'
+        return None
+
+    def process_response(self, request, response):
+        """Сжимает ответ, если это возможно и выгодно."""
+        if response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '')
+        if not content_type.startswith(COMPRESSIBLE_CONTENT_TYPES):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = self._choose_encoding(request)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if encoding == 'br':
+                compressed = _brotli_sequence(response.streaming_content)
+            else:
+                compressed = compress_sequence(
+                    response.streaming_content,
+                    max_random_bytes=GZIP_MAX_RANDOM_BYTES,
+                )
+            response.streaming_content = compressed
+            del response.headers['Content-Length']
+        else:
+            if encoding == 'br':
+                compressed = brotli.compress(response.content)
+            else:
+                compressed = compress_string(
+                    response.content, max_random_bytes=GZIP_MAX_RANDOM_BYTES
+                )
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
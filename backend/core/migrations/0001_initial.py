@@ -0,0 +1,43 @@
+# Generated by Django 5.1.1 on 2026-10-16 23:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="Watermark",
+            fields=[
+                (
+                    "name",
+                    models.CharField(
+                        max_length=100,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Задача",
+                    ),
+                ),
+                (
+                    "value",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Обработано по"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Обновлено"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Отметка обработки",
+                "verbose_name_plural": "Отметки обработки",
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import models
+
+
+class Watermark(models.Model):
+    """
+    Отметка последней обработанной записи для инкрементальных задач
+    (пересчёт рейтингов, рекомендаций): задача обрабатывает только
+    записи новее отметки и сдвигает её вперёд.
+    """
+
+    name = models.CharField('Задача', max_length=100, primary_key=True)
+    value = models.DateTimeField('Обработано по', null=True, blank=True)
+    updated_at = models.DateTimeField('Обновлено', auto_now=True)
+
+    class Meta:
+        """Метаданные отметок обработки."""
+
+        verbose_name = 'Отметка обработки'
+        verbose_name_plural = 'Отметки обработки'
+
+    def __str__(self):
+        """Возвращает имя задачи и отметку."""
+        return f'{self.name}: {self.value}'
@@ -1,9 +1,161 @@
-from rest_framework.pagination import PageNumberPagination
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+from core.counting import get_count
+
+
+class EstimatedPage(Page):
+    """
+    Страница пагинатора с оценочным количеством записей.
+
+    Наличие следующей страницы определяется по лишней выбранной записи,
+    а не по числу страниц, вычисленному из оценки.
+    """
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        """Возвращает True, если за страницей есть ещё записи."""
+        return self._has_next
+
+    def next_page_number(self):
+        """Возвращает номер следующей страницы без проверки по оценке."""
+        return self.number + 1
+
+    def previous_page_number(self):
+        """Возвращает номер предыдущей страницы без проверки по оценке."""
+        return self.number - 1
+
+
+class CountingPaginator(Paginator):
+    """
+    Пагинатор, получающий общее количество через core.counting:
+    точный COUNT для небольших наборов, оценку планировщика
+    и кеш для больших.
+    """
+
+    @cached_property
+    def _count_info(self):
+        """Возвращает пару (количество, is_estimated)."""
+        if not hasattr(self.object_list, 'query'):
+            return len(self.object_list), False
+        return get_count(self.object_list)
+
+    @cached_property
+    def count(self):
+        """Возвращает точное или оценочное количество записей."""
+        return self._count_info[0]
+
+    @property
+    def count_is_estimated(self):
+        """Возвращает True, если количество получено оценкой."""
+        return self._count_info[1]
+
+    def page(self, number):
+        """
+        Возвращает страницу; при оценочном количестве не ограничивает
+        номер страницы сверху и выбирает одну запись сверх размера.
+        """
+        if not self.count_is_estimated:
+            return super().page(number)
+
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            number = 0
+        if number < 1:
+            raise EmptyPage(self.error_messages['min_page'])
+
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages['no_results'])
+        return EstimatedPage(
+            rows[:self.per_page],
+            number,
+            self,
+            has_next=len(rows) > self.per_page,
+        )
+
+
+class CustomCursorPagination(CursorPagination):
+    """
+    Курсорная (keyset) пагинация: страницы выбираются по ключу сортировки
+    без OFFSET и без подсчёта общего количества записей.
+    """
+
+    page_size_query_param = 'limit'
+    page_size = 6
+    max_page_size = 200
+    ordering = '-id'
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Возвращает сортировку, заданную вьюхой через get_cursor_ordering().
+        """
+        get_cursor_ordering = getattr(view, 'get_cursor_ordering', None)
+        ordering = get_cursor_ordering() if get_cursor_ordering else None
+        if not ordering:
+            ordering = self.ordering
+        if isinstance(ordering, str):
+            return (ordering,)
+        return tuple(ordering)
 
 
 class CustomPagePagination(PageNumberPagination):
-    """Пагинация с выбором размера страницы через параметр 'limit'."""
+    """
+    Пагинация с выбором размера страницы через параметр 'limit'.
+
+    Общее количество считается через CountingPaginator: для больших
+    наборов используется кешируемая оценка вместо точного COUNT(*).
+
+    Для вьюх, реализующих get_cursor_ordering(), доступен курсорный режим:
+    он включается параметром ?pagination=cursor или переданным ?cursor=.
+    В этом режиме ответ содержит только next/previous/results.
+    """
 
     page_size_query_param = 'limit'
     page_size = 6
     max_page_size = 200
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    cursor_pagination_class = CustomCursorPagination
+    django_paginator_class = CountingPaginator
+
+    cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Делегирует пагинацию курсорному пагинатору, если клиент его выбрал.
+        """
+        self.cursor_paginator = None
+        if self.use_cursor(request, view):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        """
+        Формирует ответ в формате выбранного режима пагинации.
+        """
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def use_cursor(self, request, view):
+        """
+        Проверяет, запрошен ли курсорный режим и поддерживает ли его вьюха.
+        """
+        get_cursor_ordering = getattr(view, 'get_cursor_ordering', None)
+        if get_cursor_ordering is None or not get_cursor_ordering():
+            return False
+        params = request.query_params
+        return (
+            self.cursor_query_param in params
+            or params.get(self.mode_query_param) == 'cursor'
+        )
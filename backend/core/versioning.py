@@ -0,0 +1,100 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_CACHE_PREFIX = 'version'
+
+RECIPES_VERSION = 'recipes'
+POPULARITY_VERSION = 'recipes:popularity'
+TRENDING_VERSION = 'recipes:trending'
+SIMILAR_VERSION = 'recipes:similar'
+TAGS_VERSION = 'tags'
+INGREDIENTS_VERSION = 'ingredients'
+USERS_VERSION = 'users'
+
+
+def versions_shared() -> bool:
+    """
+    Проверяет, что кеш общий для всех процессов (настройка SHARED_CACHE).
+
+    В локальном кеше процесса версию, увеличенную одним воркером,
+    другие не видят, поэтому зависящие от неё кеши на нём отключаются.
+    """
+    return getattr(settings, 'SHARED_CACHE', False)
+
+
+def _version_key(name: str) -> str:
+    """Возвращает ключ кеша для счётчика версии."""
+    return f'{VERSION_CACHE_PREFIX}:{name}'
+
+
+def _initial_version() -> int:
+    """
+    Возвращает начальное значение счётчика.
+
+    Значение строится от текущего времени, чтобы после вытеснения ключа
+    из кеша версия не совпала ни с одной из ранее выданных.
+    """
+    return int(time.time() * 1000)
+
+
+def get_version(name: str) -> int:
+    """
+    Возвращает текущую версию именованного набора данных.
+    """
+    key = _version_key(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(name: str) -> int:
+    """
+    Увеличивает версию набора данных, делая недействительными
+    все кеши, в ключ которых она входит.
+    """
+    key = _version_key(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _initial_version()
+        cache.set(key, version, None)
+        return version
+
+
+def bump_version_on_commit(*names):
+    """
+    Увеличивает версии наборов данных после фиксации транзакции,
+    чтобы в кеши не попали данные незавершённых изменений.
+    """
+
+    def bump():
+        for name in names:
+            bump_version(name)
+
+    transaction.on_commit(bump)
+
+
+def get_versions(names) -> dict:
+    """
+    Возвращает версии нескольких наборов данных одним обращением к кешу.
+    """
+    keys = {_version_key(name): name for name in names}
+    found = cache.get_many(list(keys))
+    versions = {keys[key]: value for key, value in found.items()}
+    for name in names:
+        if name not in versions:
+            versions[name] = get_version(name)
+    return versions
+
+
+def viewer_version_name(user_id) -> str:
+    """
+    Возвращает имя версии состояния пользователя: избранного,
+    списка покупок и подписок.
+    """
+    return f'viewer:{user_id}'
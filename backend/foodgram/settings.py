@@ -1,10 +1,15 @@
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
 DEBUG = os.environ['DJANGO_DEBUG'].lower() == 'true'
+API_BROWSABLE = (
+    os.environ.get('API_BROWSABLE', str(DEBUG)).lower() == 'true'
+)
 
 ALLOWED_HOSTS = os.environ['ALLOWED_HOSTS'].split(',')
 
@@ -22,6 +27,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     'rest_framework',
     'rest_framework.authtoken',
@@ -40,6 +46,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -99,11 +106,48 @@ MEDIA_ROOT = Path('/app/media/')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Кеш документов рецептов, версии для ETag и пересборка индексов в памяти
+# рассчитаны на кеш, общий для всех воркеров. Локальный кеш процесса
+# допустим только при разработке: с ним эти механизмы отключаются.
+REDIS_URL = os.environ.get('REDIS_URL', '')
+SHARED_CACHE = bool(REDIS_URL)
+if not DEBUG and not SHARED_CACHE:
+    raise ImproperlyConfigured(
+        'Задайте REDIS_URL: без DEBUG нужен общий для всех процессов кеш.'
+    )
+
+CACHES = {
+    'default': (
+        {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+        if SHARED_CACHE
+        else {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    ),
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'core.pagination.CustomPagePagination',
     'PAGE_SIZE': 6,
     'PAGE_SIZE_QUERY_PARAM': 'limit',
 
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        *(
+            ['rest_framework.renderers.BrowsableAPIRenderer']
+            if API_BROWSABLE
+            else []
+        ),
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
     ],
@@ -136,6 +180,38 @@ DJOSER = {
     'HIDE_USERS': False,
 }
 
+API_COMPRESSION_MIN_SIZE = int(
+    os.environ.get('API_COMPRESSION_MIN_SIZE', 1024)
+)
+
+PAGINATION_COUNT_CACHE_TTL = int(
+    os.environ.get('PAGINATION_COUNT_CACHE_TTL', 30)
+)
+PAGINATION_COUNT_CACHE_THRESHOLD = int(
+    os.environ.get('PAGINATION_COUNT_CACHE_THRESHOLD', 1000)
+)
+PAGINATION_COUNT_ESTIMATE_THRESHOLD = int(
+    os.environ.get('PAGINATION_COUNT_ESTIMATE_THRESHOLD', 100000)
+)
+
+RECIPE_DOCUMENT_CACHE_TTL = int(
+    os.environ.get('RECIPE_DOCUMENT_CACHE_TTL', 3600)
+)
+INGREDIENT_SEARCH_LIMIT = int(
+    os.environ.get('INGREDIENT_SEARCH_LIMIT', 20)
+)
+
+RECIPE_FACETS_CACHE_TTL = int(
+    os.environ.get('RECIPE_FACETS_CACHE_TTL', 300)
+)
+SHOPPING_PDF_FONT_PATH = os.environ.get(
+    'SHOPPING_PDF_FONT_PATH',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+)
+RECIPE_FAST_RENDER = (
+    os.environ.get('RECIPE_FAST_RENDER', 'true').lower() == 'true'
+)
+
 SHORTLINK_CODE_LENGTH = int(os.environ['SHORTLINK_CODE_LENGTH'])
 SHORTLINK_MAX_ATTEMPTS = int(os.environ['SHORTLINK_MAX_ATTEMPTS'])
 FRONTEND_BASE_URL = os.environ['FRONTEND_BASE_URL']
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from django.db.models import Count
+
+from shopping.totals import add_recipe_to_carts, subtract_recipe_from_carts
 
 from .models import (
     Recipe,
@@ -56,17 +57,15 @@ class RecipeAdmin(admin.ModelAdmin):
     search_fields = ('name', 'author__username', 'author__email')
     list_filter = ('tags',)
     inlines = (RecipeTagInline, RecipeIngredientInline)
+    readonly_fields = ('favorites_count',)
 
-    def get_queryset(self, request):
+    def save_related(self, request, form, formsets, change):
         """
-        Добавляет аннотацию с количеством добавлений рецепта в избранное.
+        Сохраняет инлайны, пересчитывая сводные списки покупок
+        корзин с этим рецептом на разницу составов.
         """
-        queryset = super().get_queryset(request)
-        return queryset.annotate(
-            fav_count=Count('favorited_by', distinct=True)
-        )
-
-    @admin.display(description='В избранном')
-    def favorites_count(self, obj: Recipe):
-        """Возвращает число пользователей, добавивших рецепт в избранное."""
-        return getattr(obj, 'fav_count', 0)
+        if change:
+            subtract_recipe_from_carts(form.instance.pk)
+        super().save_related(request, form, formsets, change)
+        if change:
+            add_recipe_to_carts(form.instance.pk)
@@ -7,3 +7,7 @@ class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
     verbose_name = 'Рецепты'
+
+    def ready(self):
+        """Импортирует сигналы при загрузке приложения."""
+        from . import signals  # noqa: F401
@@ -0,0 +1,135 @@
+from typing import Dict, Iterable, List
+
+from django.db import connection, transaction
+
+from core.versioning import (
+    POPULARITY_VERSION,
+    bump_version_on_commit,
+    viewer_version_name,
+)
+from favorites.models import Favorite
+from recipes.models import Recipe
+from shopping.models import ShoppingList
+from shopping.totals import apply_cart_changes
+
+STATUS_ADDED = 'added'
+STATUS_EXISTS = 'exists'
+STATUS_REMOVED = 'removed'
+STATUS_ABSENT = 'absent'
+STATUS_NOT_FOUND = 'not_found'
+
+
+def _update_favorites_count(recipe_ids: List[int], delta: int):
+    """
+    Меняет счётчики избранного у рецептов одним UPDATE и отмечает
+    время изменения, как сигналы Favorite. Строки блокируются
+    в порядке id, чтобы параллельные запросы не взаимоблокировались.
+    """
+    recipes = Recipe._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {recipes} '
+            f'SET favorites_count = GREATEST(favorites_count + %s, 0), '
+            f'favorites_changed_at = NOW() '
+            f'WHERE id IN ('
+            f'SELECT id FROM {recipes} WHERE id = ANY(%s) '
+            f'ORDER BY id FOR UPDATE)',
+            [delta, recipe_ids],
+        )
+
+
+def _after_change(model, user_id: int, added: List[int], removed: List[int]):
+    """
+    Повторяет побочные эффекты сигналов Favorite и ShoppingList,
+    которые массовые запросы не вызывают: счётчики избранного, сводный
+    список покупок и версии для ETag.
+    """
+    if not added and not removed:
+        return
+    names = [viewer_version_name(user_id)]
+    if model is Favorite:
+        if added:
+            _update_favorites_count(added, 1)
+        if removed:
+            _update_favorites_count(removed, -1)
+        names.append(POPULARITY_VERSION)
+    elif model is ShoppingList:
+        apply_cart_changes(user_id, added, removed)
+    bump_version_on_commit(*names)
+
+
+def _unique(recipe_ids: Iterable[int]) -> List[int]:
+    """Убирает повторы, сохраняя порядок."""
+    return list(dict.fromkeys(recipe_ids))
+
+
+@transaction.atomic
+def bulk_add_recipes(
+    model, user_id: int, recipe_ids: Iterable[int]
+) -> Dict[int, str]:
+    """
+    Добавляет рецепты в избранное или список покупок (model) одним
+    INSERT … ON CONFLICT DO NOTHING.
+
+    Возвращает статус для каждого id в порядке запроса: added,
+    exists (уже был) или not_found (рецепта нет).
+    """
+    recipe_ids = _unique(recipe_ids)
+    table = model._meta.db_table
+    recipes = Recipe._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'''
+            WITH found AS (
+                SELECT id FROM {recipes} WHERE id = ANY(%s)
+            ), inserted AS (
+                INSERT INTO {table} (user_id, recipe_id, added_at)
+                SELECT %s, id, NOW() FROM found ORDER BY id
+                ON CONFLICT (user_id, recipe_id) DO NOTHING
+                RETURNING recipe_id
+            )
+            SELECT f.id, i.recipe_id IS NOT NULL
+            FROM found f LEFT JOIN inserted i ON i.recipe_id = f.id
+            ''',
+            [recipe_ids, user_id],
+        )
+        found = dict(cursor.fetchall())
+    _after_change(
+        model, user_id, [pk for pk, new in found.items() if new], []
+    )
+    return {
+        pk: (
+            STATUS_NOT_FOUND if pk not in found
+            else STATUS_ADDED if found[pk]
+            else STATUS_EXISTS
+        )
+        for pk in recipe_ids
+    }
+
+
+@transaction.atomic
+def bulk_remove_recipes(
+    model, user_id: int, recipe_ids: Iterable[int]
+) -> Dict[int, str]:
+    """
+    Удаляет рецепты из избранного или списка покупок (model) одним
+    DELETE … WHERE recipe_id = ANY(…).
+
+    Возвращает статус для каждого id в порядке запроса: removed
+    или absent (его там не было).
+    """
+    recipe_ids = _unique(recipe_ids)
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} '
+            f'WHERE user_id = %s AND recipe_id = ANY(%s) '
+            f'RETURNING recipe_id',
+            [user_id, recipe_ids],
+        )
+        removed = {row[0] for row in cursor.fetchall()}
+    _after_change(model, user_id, [], list(removed))
+    return {
+        pk: STATUS_REMOVED if pk in removed else STATUS_ABSENT
+        for pk in recipe_ids
+    }
@@ -0,0 +1,245 @@
+import threading
+from typing import Dict, FrozenSet, Iterable, NamedTuple, Tuple
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+
+from core.arrays import sorted_lookup
+from core.versioning import bump_version, get_version
+from recipes.models import RecipeIngredient
+
+CHANGELOG_VERSION = 'recipes:ingredients-log'
+CHANGELOG_PREFIX = 'recipes:ingredients-log'
+CHANGELOG_TTL = 24 * 60 * 60
+MAX_PENDING_CHANGES = 1000
+MAX_OVERLAY_SIZE = 5000
+
+
+def _changelog_key(seq: int) -> str:
+    """Возвращает ключ кеша записи журнала изменений."""
+    return f'{CHANGELOG_PREFIX}:{seq}'
+
+
+def record_recipe_changes(recipe_ids: Iterable[int]):
+    """
+    Записывает в журнал рецепты, у которых изменился состав.
+
+    Запись выполняется после фиксации транзакции. Журнал хранится
+    в кеше, общем для всех процессов (без DEBUG настройки требуют
+    REDIS_URL): каждая запись получает следующий номер версии
+    CHANGELOG_VERSION, по которому процессы догоняют свои индексы.
+    С локальным кешем разработки журнал виден только своему процессу.
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+
+    def record():
+        seq = bump_version(CHANGELOG_VERSION)
+        cache.set(_changelog_key(seq), recipe_ids, CHANGELOG_TTL)
+
+    transaction.on_commit(record)
+
+
+class _IndexData(NamedTuple):
+    """
+    Неизменяемая часть индекса в формате CSR и наложение изменений.
+    """
+
+    recipe_ids: np.ndarray
+    sizes: np.ndarray
+    ingredient_ids: np.ndarray
+    offsets: np.ndarray
+    postings: np.ndarray
+    stale: np.ndarray
+    overlay: Dict[int, FrozenSet[int]]
+    seq: int
+
+
+def _build(recipes: np.ndarray, ingredients: np.ndarray, seq: int):
+    """
+    Строит индекс из пар (рецепт, ингредиент).
+
+    Для каждого ингредиента хранится отсортированный список позиций
+    рецептов (postings, границы — offsets), для каждого рецепта —
+    число его ингредиентов.
+    """
+    recipe_ids, recipe_pos = np.unique(recipes, return_inverse=True)
+    ingredient_ids, ingredient_pos = np.unique(
+        ingredients, return_inverse=True
+    )
+    order = np.lexsort((recipe_pos, ingredient_pos))
+    offsets = np.searchsorted(
+        ingredient_pos[order], np.arange(len(ingredient_ids) + 1)
+    )
+    return _IndexData(
+        recipe_ids=recipe_ids,
+        sizes=np.bincount(recipe_pos, minlength=len(recipe_ids)),
+        ingredient_ids=ingredient_ids,
+        offsets=offsets,
+        postings=recipe_pos[order],
+        stale=np.zeros(len(recipe_ids), dtype=bool),
+        overlay={},
+        seq=seq,
+    )
+
+
+def _load_pairs(recipe_ids=None) -> Tuple[np.ndarray, np.ndarray]:
+    """Загружает пары (рецепт, ингредиент) из RecipeIngredient."""
+    queryset = RecipeIngredient.objects.order_by()
+    if recipe_ids is not None:
+        queryset = queryset.filter(recipe_id__in=recipe_ids)
+    rows = np.array(
+        queryset.values_list('recipe_id', 'ingredient_id').distinct(),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    return rows[:, 0], rows[:, 1]
+
+
+class RecipeIngredientIndex:
+    """
+    Инвертированный индекс ингредиент → рецепты для подбора рецептов
+    по имеющимся продуктам.
+
+    Индекс строится в памяти процесса при первом обращении. Изменения
+    состава рецептов не перестраивают его целиком: рецепты из журнала
+    (record_recipe_changes) перечитываются из БД и кладутся в
+    наложение, а их строки в основной части помечаются устаревшими.
+    Когда наложение разрастается, оно сливается с основной частью без
+    обращения к БД. Полная перестройка нужна, только если журнал
+    в кеше потерян или отставание слишком велико. Как и журнал,
+    индекс рассчитан на общий для процессов кеш.
+    """
+
+    def __init__(self):
+        """Создаёт пустой индекс."""
+        self._lock = threading.Lock()
+        self._data = None
+
+    def _rebuild(self):
+        """Полностью перестраивает индекс из БД."""
+        seq = get_version(CHANGELOG_VERSION)
+        return _build(*_load_pairs(), seq)
+
+    def _apply(self, data, recipe_ids, seq):
+        """
+        Перечитывает состав изменённых рецептов в наложение.
+        Удалённые рецепты попадают в наложение с пустым составом.
+        """
+        recipe_ids = set(recipe_ids)
+        recipes, ingredients = _load_pairs(recipe_ids)
+        composition = {pk: set() for pk in recipe_ids}
+        for recipe_id, ingredient_id in zip(
+            recipes.tolist(), ingredients.tolist()
+        ):
+            composition[recipe_id].add(ingredient_id)
+
+        overlay = dict(data.overlay)
+        overlay.update(
+            (pk, frozenset(items)) for pk, items in composition.items()
+        )
+        stale = data.stale.copy()
+        changed = np.fromiter(recipe_ids, dtype=np.int64)
+        positions, found = sorted_lookup(data.recipe_ids, changed)
+        stale[positions[found]] = True
+        data = data._replace(overlay=overlay, stale=stale, seq=seq)
+        if len(overlay) > MAX_OVERLAY_SIZE:
+            data = self._compact(data)
+        return data
+
+    def _compact(self, data):
+        """Сливает наложение с основной частью индекса."""
+        lengths = np.diff(data.offsets)
+        recipes = data.recipe_ids[data.postings]
+        ingredients = np.repeat(data.ingredient_ids, lengths)
+        keep = ~data.stale[data.postings]
+        extra = [
+            (pk, item) for pk, items in data.overlay.items() for item in items
+        ]
+        extra = np.array(extra, dtype=np.int64).reshape(-1, 2)
+        return _build(
+            np.concatenate([recipes[keep], extra[:, 0]]),
+            np.concatenate([ingredients[keep], extra[:, 1]]),
+            data.seq,
+        )
+
+    def get_data(self):
+        """Возвращает индекс, догнав журнал изменений."""
+        current = get_version(CHANGELOG_VERSION)
+        data = self._data
+        if data is not None and data.seq == current:
+            return data
+        with self._lock:
+            data = self._data
+            if data is not None and data.seq == current:
+                return data
+            if data is None or not 0 < current - data.seq <= (
+                MAX_PENDING_CHANGES
+            ):
+                data = self._rebuild()
+            else:
+                keys = [
+                    _changelog_key(seq)
+                    for seq in range(data.seq + 1, current + 1)
+                ]
+                found = cache.get_many(keys)
+                if len(found) < len(keys):
+                    data = self._rebuild()
+                else:
+                    changed = {pk for ids in found.values() for pk in ids}
+                    data = self._apply(data, changed, current)
+            self._data = data
+        return data
+
+    def search(self, ingredient_ids: Iterable[int], max_missing=None):
+        """
+        Возвращает рецепты, где есть хотя бы один из ингредиентов.
+
+        Результат — массивы id рецептов и числа недостающих
+        ингредиентов, упорядоченные: сначала рецепты без недостающих,
+        затем с одним и т. д.; при равенстве — больше совпадений,
+        затем новее.
+        """
+        data = self.get_data()
+        wanted = np.unique(np.fromiter(ingredient_ids, dtype=np.int64))
+        pos, found = sorted_lookup(data.ingredient_ids, wanted)
+        pos = pos[found]
+
+        if len(pos):
+            hits = np.bincount(
+                np.concatenate([
+                    data.postings[data.offsets[i]:data.offsets[i + 1]]
+                    for i in pos
+                ]),
+                minlength=len(data.recipe_ids),
+            )
+        else:
+            hits = np.zeros(len(data.recipe_ids), dtype=np.int64)
+        candidates = np.flatnonzero((hits > 0) & ~data.stale)
+        recipe_ids = data.recipe_ids[candidates]
+        matched = hits[candidates]
+        missing = data.sizes[candidates] - matched
+
+        wanted_set = set(wanted.tolist())
+        extra = [
+            (pk, len(items & wanted_set), len(items - wanted_set))
+            for pk, items in data.overlay.items()
+            if items & wanted_set
+        ]
+        if extra:
+            extra = np.array(extra, dtype=np.int64)
+            recipe_ids = np.concatenate([recipe_ids, extra[:, 0]])
+            matched = np.concatenate([matched, extra[:, 1]])
+            missing = np.concatenate([missing, extra[:, 2]])
+
+        if max_missing is not None:
+            keep = missing <= max_missing
+            recipe_ids, matched, missing = (
+                recipe_ids[keep], matched[keep], missing[keep]
+            )
+        order = np.lexsort((-recipe_ids, -matched, missing))
+        return recipe_ids[order], missing[order]
+
+
+cook_index = RecipeIngredientIndex()
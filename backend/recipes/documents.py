@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import BooleanField, Prefetch, Value
+
+from core.fields import FIELDS_CONTEXT_KEY
+from core.versioning import bump_version, get_versions, versions_shared
+from recipes.models import Recipe, RecipeIngredient, RecipeTag
+from recipes.serializers import RecipeReadSerializer
+from users.models import User
+from users.serializers import (
+    SUBSCRIBED_IDS_CONTEXT_KEY,
+    load_subscribed_author_ids,
+)
+
+DOC_CACHE_PREFIX = 'recipes:doc'
+DOC_VERSION_PREFIX = 'recipes:doc'
+CATALOG_VERSION = 'recipes:catalog'
+
+RECIPE_FIELDS = RecipeReadSerializer.Meta.fields
+VIEWER_FIELDS = ('is_favorited', 'is_in_shopping_cart')
+EXPENSIVE_FIELDS = ('tags', 'author', 'ingredients', 'text')
+AUTHOR_COLUMNS = (
+    'author_id',
+    'author__email',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+    'author__avatar',
+)
+
+
+def _doc_version_name(recipe_id: int) -> str:
+    """Возвращает имя версии документа рецепта."""
+    return f'{DOC_VERSION_PREFIX}:{recipe_id}'
+
+
+def _doc_key(recipe_id: int, generation: int, version: int) -> str:
+    """Возвращает ключ кеша документа рецепта."""
+    return f'{DOC_CACHE_PREFIX}:{generation}:{recipe_id}:{version}'
+
+
+def _file_url(fileobj):
+    """Возвращает относительный URL файла или None."""
+    if not fileobj:
+        return None
+    return fileobj.url
+
+
+def build_recipe_documents(
+    recipe_ids: Iterable[int],
+    request,
+    fields: Optional[Tuple[str, ...]] = None,
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Строит документы рецептов, не зависящие от текущего пользователя.
+
+    Документ совпадает с ответом RecipeReadSerializer, но признаки
+    пользователя в нём равны False, а URL фото и аватара хранятся
+    относительными: абсолютными они становятся при отдаче ответа.
+    Если передан кортеж fields, строятся только эти поля, а запросы
+    за невыбранными связями не выполняются.
+
+    По умолчанию используется быстрый путь на values(); настройка
+    RECIPE_FAST_RENDER = False возвращает сборку через сериализатор.
+    """
+    fields = fields or RECIPE_FIELDS
+    if getattr(settings, 'RECIPE_FAST_RENDER', True):
+        return _build_documents_fast(recipe_ids, fields)
+    return _build_documents_drf(recipe_ids, request, fields)
+
+
+def _build_documents_fast(
+    recipe_ids: Iterable[int],
+    fields: Tuple[str, ...],
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Собирает документы из строк values_list() без полей DRF.
+
+    Порядок ключей, типы и сортировка вложенных списков совпадают
+    с RecipeReadSerializer: теги по названию, ингредиенты по id связи.
+    """
+    recipe_ids = list(recipe_ids)
+    image_storage = Recipe._meta.get_field('image').storage
+    avatar_storage = User._meta.get_field('avatar').storage
+
+    tags = defaultdict(list)
+    if 'tags' in fields:
+        for recipe_id, tag_id, name, slug in (
+            RecipeTag.objects.filter(recipe_id__in=recipe_ids)
+            .order_by('tag__name', 'id')
+            .values_list('recipe_id', 'tag_id', 'tag__name', 'tag__slug')
+        ):
+            tags[recipe_id].append(
+                {'id': tag_id, 'name': name, 'slug': slug}
+            )
+
+    ingredients = defaultdict(list)
+    if 'ingredients' in fields:
+        for recipe_id, ingredient_id, name, unit, amount in (
+            RecipeIngredient.objects.filter(recipe_id__in=recipe_ids)
+            .order_by('id')
+            .values_list(
+                'recipe_id',
+                'ingredient_id',
+                'ingredient__name',
+                'ingredient__measurement_unit',
+                'amount',
+            )
+        ):
+            ingredients[recipe_id].append({
+                'id': ingredient_id,
+                'name': name,
+                'measurement_unit': unit,
+                'amount': amount,
+            })
+
+    columns = ['id', 'name', 'image', 'cooking_time']
+    if 'text' in fields:
+        columns.append('text')
+    if 'author' in fields:
+        columns.extend(AUTHOR_COLUMNS)
+
+    documents = {}
+    for row in Recipe.objects.filter(pk__in=recipe_ids).values(*columns):
+        recipe_id = row['id']
+        doc = {'id': recipe_id}
+        for name in fields:
+            if name == 'tags':
+                doc[name] = tags.get(recipe_id, [])
+            elif name == 'author':
+                avatar = row['author__avatar']
+                doc[name] = {
+                    'id': row['author_id'],
+                    'email': row['author__email'],
+                    'username': row['author__username'],
+                    'first_name': row['author__first_name'],
+                    'last_name': row['author__last_name'],
+                    'is_subscribed': False,
+                    'avatar': avatar_storage.url(avatar) if avatar else None,
+                }
+            elif name == 'ingredients':
+                doc[name] = ingredients.get(recipe_id, [])
+            elif name in VIEWER_FIELDS:
+                doc[name] = False
+            elif name == 'image':
+                image = row['image']
+                doc[name] = image_storage.url(image) if image else None
+            elif name != 'id':
+                doc[name] = row[name]
+        documents[recipe_id] = doc
+    return documents
+
+
+def _build_documents_drf(
+    recipe_ids: Iterable[int],
+    request,
+    fields: Tuple[str, ...],
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Собирает документы через RecipeReadSerializer (резервный путь).
+    """
+    false = Value(False, output_field=BooleanField())
+    recipes = Recipe.objects.filter(pk__in=list(recipe_ids)).annotate(
+        is_favorited=false,
+        is_in_shopping_cart=false,
+    )
+    if 'author' in fields:
+        recipes = recipes.select_related('author')
+    if 'tags' in fields:
+        recipes = recipes.prefetch_related('tags')
+    if 'ingredients' in fields:
+        recipes = recipes.prefetch_related(
+            Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient'
+                ).order_by('id'),
+            )
+        )
+    context = {
+        'request': request,
+        SUBSCRIBED_IDS_CONTEXT_KEY: frozenset(),
+        FIELDS_CONTEXT_KEY: fields,
+    }
+
+    documents = {}
+    for recipe in recipes:
+        doc = dict(RecipeReadSerializer(recipe, context=context).data)
+        if 'image' in doc:
+            doc['image'] = _file_url(recipe.image)
+        if 'author' in doc:
+            doc['author']['avatar'] = _file_url(recipe.author.avatar)
+        documents[recipe.pk] = doc
+    return documents
+
+
+def get_recipe_documents(
+    recipe_ids: List[int],
+    request,
+    fields: Optional[Tuple[str, ...]] = None,
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Возвращает документы рецептов из кеша, достраивая недостающие.
+
+    Недостающие документы строятся одним набором запросов и
+    сохраняются в кеш на RECIPE_DOCUMENT_CACHE_TTL секунд
+    (0 отключает кеширование). Документы, построенные только
+    для части полей, в кеш не попадают. Без общего кеша
+    (versions_shared) документы строятся каждый раз: сброс кеша
+    в одном процессе не дошёл бы до остальных.
+
+    В ключ входит версия документа, прочитанная до запроса к БД.
+    Если документ построен по данным до фиксации изменения, он
+    сохраняется под прежней версией и больше не читается.
+    """
+    ttl = getattr(settings, 'RECIPE_DOCUMENT_CACHE_TTL', 3600)
+    if not ttl or not versions_shared():
+        return build_recipe_documents(recipe_ids, request, fields)
+
+    versions = get_versions(
+        [CATALOG_VERSION, *map(_doc_version_name, recipe_ids)]
+    )
+    generation = versions[CATALOG_VERSION]
+    keys = {
+        _doc_key(pk, generation, versions[_doc_version_name(pk)]): pk
+        for pk in recipe_ids
+    }
+    documents = {
+        keys[key]: doc for key, doc in cache.get_many(list(keys)).items()
+    }
+
+    missing = [pk for pk in recipe_ids if pk not in documents]
+    if not missing:
+        return documents
+
+    partial = fields is not None and not set(EXPENSIVE_FIELDS) <= set(fields)
+    built = build_recipe_documents(
+        missing, request, fields if partial else None
+    )
+    if not partial:
+        cache.set_many(
+            {
+                _doc_key(
+                    pk, generation, versions[_doc_version_name(pk)]
+                ): doc
+                for pk, doc in built.items()
+            },
+            ttl,
+        )
+    documents.update(built)
+    return documents
+
+
+def invalidate_recipe_documents(recipe_ids: Iterable[int]):
+    """
+    Делает недействительными документы указанных рецептов, увеличивая
+    их версии; прежние записи вытесняются по TTL.
+    """
+    for pk in recipe_ids:
+        bump_version(_doc_version_name(pk))
+
+
+def _absolute(request, url):
+    """Превращает относительный URL в абсолютный для текущего запроса."""
+    if not url or not request:
+        return url
+    return request.build_absolute_uri(url)
+
+
+def render_recipes(
+    recipes: Iterable[Recipe],
+    request,
+    context: Dict[str, Any],
+    fields: Optional[Tuple[str, ...]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Собирает ответ для рецептов из документов и состояния пользователя.
+
+    Рецепты должны содержать аннотации is_favorited и
+    is_in_shopping_cart для выбранных полей; подписки на авторов этих
+    рецептов загружаются одним запросом, если вьюха не положила их
+    в контекст. Если передан кортеж fields, в ответ попадают только
+    эти поля.
+    """
+    fields = fields or RECIPE_FIELDS
+    recipes = list(recipes)
+    documents = get_recipe_documents(
+        [r.pk for r in recipes], request, fields
+    )
+    subscribed = None
+    if 'author' in fields:
+        subscribed = context.get(SUBSCRIBED_IDS_CONTEXT_KEY)
+        if subscribed is None:
+            subscribed = load_subscribed_author_ids(
+                request,
+                {doc['author']['id'] for doc in documents.values()},
+            )
+
+    result = []
+    for recipe in recipes:
+        doc = documents.get(recipe.pk)
+        if doc is None:
+            continue
+        data = {}
+        for name in fields:
+            if name == 'author':
+                author = dict(doc['author'])
+                author['is_subscribed'] = author['id'] in subscribed
+                author['avatar'] = _absolute(request, author['avatar'])
+                data[name] = author
+            elif name in VIEWER_FIELDS:
+                data[name] = bool(getattr(recipe, name, False))
+            elif name == 'image':
+                data[name] = _absolute(request, doc['image'])
+            else:
+                data[name] = doc[name]
+        result.append(data)
+    return result
+
+
+def get_short_recipe(recipe_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Возвращает краткое представление рецепта (как ShortRecipeSerializer)
+    по одному узкому запросу values().
+    """
+    row = (
+        Recipe.objects.filter(pk=recipe_id)
+        .values('id', 'name', 'image', 'cooking_time')
+        .first()
+    )
+    if row is not None:
+        image = row['image']
+        row['image'] = (
+            Recipe._meta.get_field('image').storage.url(image)
+            if image else None
+        )
+    return row
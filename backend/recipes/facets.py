@@ -0,0 +1,142 @@
+import hashlib
+from typing import Any, Callable, Dict, Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Exists, OuterRef, Q
+
+from core.versioning import (
+    RECIPES_VERSION,
+    get_versions,
+    versions_shared,
+    viewer_version_name,
+)
+from recipes.models import RecipeTag, Tag
+
+FACETS_CACHE_PREFIX = 'recipes:facets'
+FACET_AUTHORS_LIMIT = 20
+VIEWER_FILTERS = ('is_favorited', 'is_in_shopping_cart')
+COOKING_TIME_BUCKETS = (
+    ('up_to_15', None, 15),
+    ('from_16_to_30', 16, 30),
+    ('from_31_to_60', 31, 60),
+    ('over_60', 61, None),
+)
+
+
+def facets_cache_key(request, filter_names: Iterable[str]) -> str:
+    """
+    Строит ключ кеша по нормализованному набору фильтров.
+
+    Порядок параметров и повторяющихся значений не влияет на ключ.
+    В ключ входит версия рецептов, поэтому любая запись рецепта делает
+    кеш недействительным. Для фильтров по избранному и списку покупок
+    добавляются пользователь и версия его состояния.
+    """
+    params = request.query_params
+    parts = []
+    for name in sorted(filter_names):
+        values = sorted(set(v for v in params.getlist(name) if v))
+        if values:
+            parts.append(f'{name}={",".join(values)}')
+
+    names = [RECIPES_VERSION]
+    user = request.user
+    if user.is_authenticated and any(
+        params.get(name) not in (None, '', '0') for name in VIEWER_FILTERS
+    ):
+        parts.append(f'user={user.pk}')
+        names.append(viewer_version_name(user.pk))
+    versions = get_versions(names)
+    parts.extend(str(versions[name]) for name in names)
+    digest = hashlib.md5('&'.join(parts).encode('utf-8')).hexdigest()
+    return f'{FACETS_CACHE_PREFIX}:{digest}'
+
+
+def _bucket_filter(low, high) -> Q:
+    """Возвращает условие попадания времени готовки в диапазон."""
+    condition = Q()
+    if low is not None:
+        condition &= Q(cooking_time__gte=low)
+    if high is not None:
+        condition &= Q(cooking_time__lte=high)
+    return condition
+
+
+def compute_recipe_facets(queryset) -> Dict[str, Any]:
+    """
+    Считает фасеты для отфильтрованного набора рецептов.
+
+    Все счётчики получаются одним запросом с группировкой по автору:
+    общее число, условные COUNT по диапазонам времени готовки и по
+    каждому тегу (через EXISTS по RecipeTag). Итоги по тегам и
+    диапазонам складываются из строк авторов; в ответ попадают
+    FACET_AUTHORS_LIMIT авторов с наибольшим числом рецептов.
+    """
+    tags = list(Tag.objects.order_by('name').values('id', 'name', 'slug'))
+    annotations = {'total': Count('pk')}
+    for key, low, high in COOKING_TIME_BUCKETS:
+        annotations[f'time_{key}'] = Count(
+            'pk', filter=_bucket_filter(low, high)
+        )
+    for tag in tags:
+        annotations[f'tag_{tag["id"]}'] = Count('pk', filter=Q(Exists(
+            RecipeTag.objects.filter(recipe=OuterRef('pk'), tag_id=tag['id'])
+        )))
+    rows = list(
+        queryset.order_by()
+        .values('author_id', 'author__username')
+        .annotate(**annotations)
+        .order_by('-total', 'author_id')
+    )
+
+    def total(column):
+        return sum(row[column] for row in rows)
+
+    return {
+        'count': total('total'),
+        'tags': [
+            {**tag, 'count': total(f'tag_{tag["id"]}')} for tag in tags
+        ],
+        'authors': [
+            {
+                'id': row['author_id'],
+                'username': row['author__username'],
+                'count': row['total'],
+            }
+            for row in rows[:FACET_AUTHORS_LIMIT]
+        ],
+        'cooking_time': [
+            {
+                'key': key,
+                'min': low,
+                'max': high,
+                'count': total(f'time_{key}'),
+            }
+            for key, low, high in COOKING_TIME_BUCKETS
+        ],
+    }
+
+
+def get_recipe_facets(
+    request, filter_names: Iterable[str], get_queryset: Callable
+) -> Dict[str, Any]:
+    """
+    Возвращает фасеты из кеша или считает и кеширует их
+    на RECIPE_FACETS_CACHE_TTL секунд.
+
+    Отфильтрованный queryset запрашивается через get_queryset только
+    при промахе кеша: проверка фильтров тоже обращается к БД. Без
+    общего кеша (versions_shared) фасеты считаются каждый раз: версия
+    в ключе, увеличенная в другом процессе, здесь не видна.
+    """
+    if not versions_shared():
+        return compute_recipe_facets(get_queryset())
+    key = facets_cache_key(request, filter_names)
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_recipe_facets(get_queryset())
+        cache.set(
+            key, facets, getattr(settings, 'RECIPE_FACETS_CACHE_TTL', 300)
+        )
+    return facets
@@ -0,0 +1,241 @@
+import re
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from core.versioning import INGREDIENTS_VERSION, get_version
+from recipes.models import Ingredient
+
+NGRAM_SIZE = 3
+FUZZY_MIN_SCORE = 0.3
+FUZZY_PREFIX_BONUS = 0.2
+
+# Латинские буквы, похожие на кириллические, и сведение безударных
+# гласных («малако» → «молоко»): ключ нечёткого поиска, не для показа.
+_FUZZY_TRANSLATION = str.maketrans({
+    'ё': 'е',
+    'a': 'а',
+    'b': 'в',
+    'c': 'с',
+    'e': 'е',
+    'h': 'н',
+    'k': 'к',
+    'm': 'м',
+    'o': 'а',
+    'p': 'р',
+    't': 'т',
+    'u': 'и',
+    'x': 'х',
+    'y': 'у',
+    'о': 'а',
+})
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize_name(value: str) -> str:
+    """
+    Приводит название к виду для поиска: без регистра и пробелов.
+    Регистр снимается str.lower(), как LOWER() в SQL: casefold()
+    меняет некоторые буквы иначе («ß» → «ss»).
+    """
+    return (value or '').strip().lower()
+
+
+def fuzzy_key(value: str) -> str:
+    """
+    Приводит название к ключу нечёткого поиска: регистр, ё → е,
+    латинские двойники кириллицы, о → а и схлопывание разделителей.
+    """
+    value = normalize_name(value).translate(_FUZZY_TRANSLATION)
+    return _NON_WORD.sub(' ', value).strip()
+
+
+def ngrams(key: str) -> set:
+    """
+    Возвращает множество n-грамм ключа; каждое слово дополняется
+    пробелами, как в pg_trgm, чтобы короткие слова и начала слов
+    тоже давали n-граммы.
+    """
+    grams = set()
+    for word in key.split():
+        padded = ' ' * (NGRAM_SIZE - 1) + word + ' '
+        for i in range(len(padded) - NGRAM_SIZE + 1):
+            grams.add(padded[i:i + NGRAM_SIZE])
+    return grams
+
+
+def _load_ingredients():
+    """
+    Загружает справочник, отсортированный по названию без регистра.
+    Возвращает пары (ключ, готовая строка ответа).
+    """
+    entries = sorted(
+        (normalize_name(name), pk, name, unit)
+        for pk, name, unit in Ingredient.objects.values_list(
+            'id', 'name', 'measurement_unit'
+        )
+    )
+    return [
+        (key, {'id': pk, 'name': name, 'measurement_unit': unit})
+        for key, pk, name, unit in entries
+    ]
+
+
+class VersionedIngredientIndex(ABC):
+    """
+    Индекс справочника ингредиентов в памяти процесса.
+
+    Справочник небольшой и меняется редко, поэтому каждый процесс
+    строит индекс при первом обращении и пересобирает его, когда
+    меняется версия INGREDIENTS_VERSION (её увеличивают сигналы
+    при изменении ингредиентов). Готовые данные заменяются одним
+    присваиванием, поэтому чтение не требует блокировки.
+
+    Версию других процессов видно только через общий кеш: без DEBUG
+    настройки требуют REDIS_URL, а с локальным кешем разработки индекс
+    верен, лишь пока процесс один.
+    """
+
+    def __init__(self):
+        """Создаёт пустой индекс; данные загружаются при первом поиске."""
+        self._lock = threading.Lock()
+        self._version = None
+        self._data = None
+
+    @abstractmethod
+    def build(self, entries):
+        """Строит данные индекса из пар (ключ, строка ответа)."""
+
+    def get_data(self, force=False):
+        """
+        Возвращает данные индекса, пересобрав их при смене версии
+        или принудительно (force).
+        """
+        version = get_version(INGREDIENTS_VERSION)
+        if force or version != self._version:
+            with self._lock:
+                if force or version != self._version:
+                    self._data = self.build(_load_ingredients())
+                    self._version = version
+        return self._data
+
+
+class IngredientPrefixIndex(VersionedIngredientIndex):
+    """
+    Отсортированный индекс для автодополнения по префиксу.
+
+    Хранит параллельные массивы ключей (названия в нижнем регистре) и готовых
+    ответов. Поиск — бинарный поиск начала диапазона и проход вперёд,
+    пока ключ начинается с префикса.
+    """
+
+    def build(self, entries):
+        """Возвращает массивы ключей и строк ответа."""
+        return (
+            [key for key, _ in entries],
+            [row for _, row in entries],
+        )
+
+    def search(
+        self, prefix: str, limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Возвращает ингредиенты, название которых начинается с prefix,
+        в алфавитном порядке; не больше limit, если он задан.
+        """
+        keys, rows = self.get_data()
+        prefix = normalize_name(prefix)
+        start = bisect_left(keys, prefix)
+        stop = start
+        end = len(keys) if limit is None else min(len(keys), start + limit)
+        while stop < end and keys[stop].startswith(prefix):
+            stop += 1
+        return rows[start:stop]
+
+
+class _FuzzyData(NamedTuple):
+    """Данные нечёткого индекса."""
+
+    rows: List[Dict[str, Any]]
+    keys: np.ndarray
+    vocabulary: Dict[str, int]
+    postings: np.ndarray
+    offsets: np.ndarray
+    sizes: np.ndarray
+
+
+class FuzzyIngredientIndex(VersionedIngredientIndex):
+    """
+    Нечёткий поиск по инвертированному индексу n-грамм.
+
+    Для каждой n-граммы хранится список ингредиентов (CSR: общий массив
+    postings и смещения offsets). Запрос разбивается на n-граммы, их
+    списки склеиваются и считаются np.bincount — это число общих
+    n-грамм с каждым ингредиентом. Оценка — коэффициент Дайса плюс
+    бонус за совпадение начала; возвращаются лучшие top-k.
+    """
+
+    def build(self, entries):
+        """Строит словарь n-грамм и CSR-списки ингредиентов."""
+        vocabulary = {}
+        gram_ids, doc_ids, sizes = [], [], []
+        for doc, (_, row) in enumerate(entries):
+            grams = ngrams(fuzzy_key(row['name']))
+            sizes.append(len(grams))
+            for gram in grams:
+                gram_ids.append(vocabulary.setdefault(gram, len(vocabulary)))
+                doc_ids.append(doc)
+        gram_ids = np.asarray(gram_ids, dtype=np.int32)
+        order = np.argsort(gram_ids, kind='stable')
+        offsets = np.searchsorted(
+            gram_ids[order], np.arange(len(vocabulary) + 1)
+        )
+        return _FuzzyData(
+            rows=[row for _, row in entries],
+            keys=np.array(
+                [fuzzy_key(row['name']) for _, row in entries], dtype=str
+            ),
+            vocabulary=vocabulary,
+            postings=np.asarray(doc_ids, dtype=np.int32)[order],
+            offsets=offsets,
+            sizes=np.asarray(sizes, dtype=np.float32),
+        )
+
+    def search(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        """
+        Возвращает до limit ингредиентов, наиболее похожих на query,
+        в порядке убывания оценки (при равенстве — по алфавиту).
+        """
+        data = self.get_data()
+        key = fuzzy_key(query)
+        grams = ngrams(key)
+        known = [data.vocabulary[g] for g in grams if g in data.vocabulary]
+        if not known or not data.rows:
+            return []
+
+        hits = np.bincount(
+            np.concatenate([
+                data.postings[data.offsets[g]:data.offsets[g + 1]]
+                for g in known
+            ]),
+            minlength=len(data.rows),
+        )
+        candidates = np.flatnonzero(hits)
+        scores = 2 * hits[candidates] / (len(grams) + data.sizes[candidates])
+        scores += FUZZY_PREFIX_BONUS * np.char.startswith(
+            data.keys[candidates], key
+        )
+        keep = scores >= FUZZY_MIN_SCORE
+        candidates, scores = candidates[keep], scores[keep]
+        if len(candidates) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            candidates, scores = candidates[top], scores[top]
+        order = np.lexsort((candidates, -scores))
+        return [data.rows[i] for i in candidates[order]]
+
+
+ingredient_index = IngredientPrefixIndex()
+fuzzy_ingredient_index = FuzzyIngredientIndex()
@@ -0,0 +1,63 @@
+from typing import Any, Dict, List
+
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Lower
+
+from recipes.ingredient_index import normalize_name
+from recipes.models import Ingredient, RecipeIngredient
+
+RANK_PREFIX = 0
+RANK_CONTAINS = 1
+
+
+def _popularity():
+    """
+    Подзапрос числа рецептов с ингредиентом (по индексу внешнего ключа).
+    """
+    usage = (
+        RecipeIngredient.objects.filter(ingredient=OuterRef('pk'))
+        .order_by()
+        .values('ingredient')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(usage, output_field=IntegerField()), 0)
+
+
+def search_ingredients_ranked(
+    query: str, limit: int
+) -> List[Dict[str, Any]]:
+    """
+    Ищет ингредиенты одним запросом UNION ALL и ранжирует результат.
+
+    Сначала идут совпадения по началу названия — эта часть выбирается
+    по индексу idx_ingredient_name_pattern (LOWER(name)
+    text_pattern_ops), затем совпадения по подстроке. Внутри каждой
+    группы ингредиенты упорядочены по числу рецептов, где они
+    используются. Каждая часть и весь результат ограничены limit.
+    """
+    term = normalize_name(query)
+    base = Ingredient.objects.annotate(
+        lower_name=Lower('name'),
+    )
+    columns = ('id', 'name', 'measurement_unit', 'rank', 'popularity')
+    prefix = (
+        base.filter(lower_name__startswith=term)
+        .annotate(rank=Value(RANK_PREFIX), popularity=_popularity())
+        .order_by('-popularity', 'name')
+        .values_list(*columns)[:limit]
+    )
+    contains = (
+        base.filter(lower_name__contains=term)
+        .exclude(lower_name__startswith=term)
+        .annotate(rank=Value(RANK_CONTAINS), popularity=_popularity())
+        .order_by('-popularity', 'name')
+        .values_list(*columns)[:limit]
+    )
+    rows = prefix.union(contains, all=True).order_by(
+        'rank', '-popularity', 'name'
+    )[:limit]
+    return [
+        {'id': pk, 'name': name, 'measurement_unit': unit}
+        for pk, name, unit, _, _ in rows
+    ]
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from recipes.similar import build_similar_recipes
+
+
+class Command(BaseCommand):
+    """
+    Команда для расчёта похожих рецептов по совместному избранному.
+
+    По умолчанию пересчитывает только рецепты, избранное которых
+    изменилось с прошлого запуска; рассчитана на запуск по расписанию.
+    """
+
+    help = (
+        'Строит таблицу похожих рецептов («добавившие этот рецепт '
+        'добавляли и эти») по избранному.'
+    )
+
+    def add_arguments(self, parser):
+        """Добавляет флаг полного пересчёта."""
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Пересчитать соседей для всех рецептов.',
+        )
+
+    def handle(self, *args, **opts):
+        """Пересчитывает соседей и выводит число рецептов."""
+        processed = build_similar_recipes(full=opts['full'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересчитано рецептов: {processed}')
+        )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from recipes.trending import refresh_trending
+
+
+class Command(BaseCommand):
+    """
+    Команда для обновления сводной таблицы трендов рецептов.
+
+    Обрабатывает только добавления в избранное и список покупок,
+    появившиеся после прошлого запуска; рассчитана на запуск
+    по расписанию (cron) раз в несколько минут.
+    """
+
+    help = 'Обновляет оценки трендов рецептов по новым добавлениям.'
+
+    def add_arguments(self, parser):
+        """Добавляет флаг полной перестройки."""
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Пересчитать оценки по всей истории добавлений.',
+        )
+
+    def handle(self, *args, **opts):
+        """Обновляет оценки и выводит число затронутых рецептов."""
+        updated = refresh_trending(rebuild=opts['rebuild'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Обновлено оценок рецептов: {updated}')
+        )
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.1 on 2026-10-16 23:36
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="ingredient",
+            index=models.Index(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Lower("name"),
+                    name="text_pattern_ops",
+                ),
+                name="idx_ingredient_name_pattern",
+            ),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.1.1 on 2026-10-16 23:41
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_favorites_count(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    Favorite = apps.get_model("favorites", "Favorite")
+    counts = (
+        Favorite.objects.filter(recipe=OuterRef("pk"))
+        .order_by()
+        .values("recipe")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    Recipe.objects.update(
+        favorites_count=Coalesce(
+            Subquery(counts, output_field=IntegerField()), 0
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("favorites", "0003_initial"),
+        ("recipes", "0004_recipe_search_vector"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="favorites_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="В избранном"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["cooking_time", "-id"], name="idx_recipe_fastest"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["-favorites_count", "-id"], name="idx_recipe_popular"
+            ),
+        ),
+        migrations.RunPython(fill_favorites_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.1.1 on 2026-10-16 23:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0005_recipe_favorites_count"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecipeTrend",
+            fields=[
+                (
+                    "recipe",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="trend",
+                        serialize=False,
+                        to="recipes.recipe",
+                        verbose_name="Рецепт",
+                    ),
+                ),
+                (
+                    "score_day",
+                    models.FloatField(
+                        null=True, verbose_name="Оценка за день"
+                    ),
+                ),
+                (
+                    "score_week",
+                    models.FloatField(
+                        null=True, verbose_name="Оценка за неделю"
+                    ),
+                ),
+                (
+                    "score_month",
+                    models.FloatField(
+                        null=True, verbose_name="Оценка за месяц"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Обновлено"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Тренд рецепта",
+                "verbose_name_plural": "Тренды рецептов",
+                "indexes": [
+                    models.Index(
+                        fields=["-score_day", "-recipe"], name="idx_trend_day"
+                    ),
+                    models.Index(
+                        fields=["-score_week", "-recipe"],
+                        name="idx_trend_week",
+                    ),
+                    models.Index(
+                        fields=["-score_month", "-recipe"],
+                        name="idx_trend_month",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.1.1 on 2026-10-16 23:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0006_recipetrend"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="favorites_changed_at",
+            field=models.DateTimeField(
+                db_index=True,
+                editable=False,
+                null=True,
+                verbose_name="Избранное изменено",
+            ),
+        ),
+        migrations.CreateModel(
+            name="RecipeNeighbour",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "score",
+                    models.FloatField(verbose_name="Косинусная близость"),
+                ),
+                (
+                    "neighbour",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="recipes.recipe",
+                        verbose_name="Похожий рецепт",
+                    ),
+                ),
+                (
+                    "recipe",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="neighbours",
+                        to="recipes.recipe",
+                        verbose_name="Рецепт",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Похожий рецепт",
+                "verbose_name_plural": "Похожие рецепты",
+                "indexes": [
+                    models.Index(
+                        fields=["recipe", "-score", "-neighbour"],
+                        name="idx_neighbour_rank",
+                    ),
+                    models.Index(
+                        fields=["neighbour"],
+                        name="recipes_rec_neighbo_8c5dfd_idx",
+                    ),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("recipe", "neighbour"),
+                        name="unique_recipe_neighbour",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.1 on 2026-10-17 00:33
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_trending_score(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    RecipeTrend = apps.get_model("recipes", "RecipeTrend")
+    Recipe.objects.update(
+        trending_score=Subquery(
+            RecipeTrend.objects.filter(recipe=OuterRef("pk")).values(
+                "score_day"
+            )
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0007_recipe_neighbours"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="trending_score",
+            field=models.FloatField(
+                editable=False, null=True, verbose_name="Оценка тренда"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                models.OrderBy(
+                    models.F("trending_score"),
+                    descending=True,
+                    nulls_last=True,
+                ),
+                models.OrderBy(models.F("id"), descending=True),
+                name="idx_recipe_trending",
+            ),
+        ),
+        migrations.RunPython(fill_trending_score, migrations.RunPython.noop),
+    ]
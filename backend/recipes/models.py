@@ -4,7 +4,9 @@ from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from django.db import models
-from django.db.models import CheckConstraint, Q, UniqueConstraint
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db.models import CheckConstraint, F, Q, UniqueConstraint
 from django.db.models.functions import Lower
 
 from core.const import FIELD_LENGHT, MAX_FIELD_LENGHT, MID_FIELD_LENGHT
@@ -57,6 +59,10 @@ class Ingredient(models.Model):
                 Lower('name'),
                 name='idx_ingredient_name_lower',
             ),
+            models.Index(
+                OpClass(Lower('name'), name='text_pattern_ops'),
+                name='idx_ingredient_name_pattern',
+            ),
         ]
         ordering = ('name',)
         verbose_name = 'Ингредиент'
@@ -96,6 +102,20 @@ class Ingredient(models.Model):
         return f'{self.name} ({self.measurement_unit})'
 
 
+SEARCH_CONFIG = 'russian'
+
+
+def recipe_search_vector():
+    """
+    Возвращает выражение поискового вектора рецепта: название
+    с весом A, описание с весом B, морфология русского языка.
+    """
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+    )
+
+
 class Recipe(models.Model):
     """Рецепт, содержащий описание, фото, теги и ингредиенты."""
 
@@ -125,6 +145,27 @@ class Recipe(models.Model):
         verbose_name='Ингредиенты',
     )
     created_at = models.DateTimeField('Создан', auto_now_add=True)
+    favorites_count = models.PositiveIntegerField(
+        'В избранном',
+        default=0,
+        editable=False,
+    )
+    favorites_changed_at = models.DateTimeField(
+        'Избранное изменено',
+        null=True,
+        editable=False,
+        db_index=True,
+    )
+    search_vector = SearchVectorField(
+        'Поисковый вектор',
+        null=True,
+        editable=False,
+    )
+    trending_score = models.FloatField(
+        'Оценка тренда',
+        null=True,
+        editable=False,
+    )
 
     class Meta:
         """Метаданные Recipe: индексы, сортировка, ограничения."""
@@ -132,6 +173,20 @@ class Recipe(models.Model):
         indexes = [
             models.Index(fields=['author', 'created_at']),
             models.Index(fields=['name']),
+            GinIndex(fields=['search_vector'], name='idx_recipe_search'),
+            models.Index(
+                fields=['cooking_time', '-id'],
+                name='idx_recipe_fastest',
+            ),
+            models.Index(
+                fields=['-favorites_count', '-id'],
+                name='idx_recipe_popular',
+            ),
+            models.Index(
+                F('trending_score').desc(nulls_last=True),
+                F('id').desc(),
+                name='idx_recipe_trending',
+            ),
         ]
         constraints = [
             CheckConstraint(
@@ -155,6 +210,98 @@ class Recipe(models.Model):
         return self.name
 
 
+class RecipeTrend(models.Model):
+    """
+    Сводная таблица трендов: оценки рецепта по добавлениям в избранное
+    и список покупок с экспоненциальным затуханием для нескольких окон.
+
+    Оценки хранятся в логарифмической шкале относительно общей точки
+    отсчёта (см. recipes.trending), поэтому их не нужно пересчитывать
+    со временем: новые добавления просто прибавляются.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trend',
+        verbose_name='Рецепт',
+    )
+    score_day = models.FloatField('Оценка за день', null=True)
+    score_week = models.FloatField('Оценка за неделю', null=True)
+    score_month = models.FloatField('Оценка за месяц', null=True)
+    updated_at = models.DateTimeField('Обновлено', auto_now=True)
+
+    class Meta:
+        """Метаданные RecipeTrend: индексы для выборки лидеров окна."""
+
+        indexes = [
+            models.Index(
+                fields=['-score_day', '-recipe'],
+                name='idx_trend_day',
+            ),
+            models.Index(
+                fields=['-score_week', '-recipe'],
+                name='idx_trend_week',
+            ),
+            models.Index(
+                fields=['-score_month', '-recipe'],
+                name='idx_trend_month',
+            ),
+        ]
+        verbose_name = 'Тренд рецепта'
+        verbose_name_plural = 'Тренды рецептов'
+
+    def __str__(self):
+        """Возвращает рецепт и недельную оценку."""
+        return f'{self.recipe_id}: {self.score_week}'
+
+
+class RecipeNeighbour(models.Model):
+    """
+    Похожий рецепт по совместным добавлениям в избранное: «добавившие
+    этот рецепт добавляли и этот». Заполняется командой
+    build_similar_recipes (см. recipes.similar).
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='neighbours',
+        verbose_name='Рецепт',
+    )
+    neighbour = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожий рецепт',
+    )
+    score = models.FloatField('Косинусная близость')
+
+    class Meta:
+        """Метаданные RecipeNeighbour: уникальность и индекс выдачи."""
+
+        constraints = [
+            UniqueConstraint(
+                fields=['recipe', 'neighbour'],
+                name='unique_recipe_neighbour',
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['recipe', '-score', '-neighbour'],
+                name='idx_neighbour_rank',
+            ),
+            models.Index(fields=['neighbour']),
+        ]
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+
+    def __str__(self):
+        """Возвращает пару рецептов и близость."""
+        return f'{self.recipe_id} → {self.neighbour_id} ({self.score:.3f})'
+
+
 class RecipeTag(models.Model):
     """Связь рецепта с тегом."""
 
@@ -3,14 +3,20 @@ from __future__ import annotations
 from typing import Any, Dict, List
 
 from django.db import transaction
+from django.db.models import BigIntegerField
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
+from core.fields import SparseFieldsMixin
 from favorites.models import Favorite
+from recipes.cook_index import record_recipe_changes
 from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
 from shopping.models import ShoppingList
-from users.models import Follow, User
-from users.serializers import CustomUserSerializer
+from shopping.totals import add_recipe_to_carts, subtract_recipe_from_carts
+from users.models import User
+from users.serializers import CustomUserSerializer, is_subscribed_to
+
+BULK_RECIPES_LIMIT = 100
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -116,13 +122,10 @@ class AuthorMiniSerializer(serializers.ModelSerializer):
         """
         Возвращает True, если текущий пользователь подписан на автора.
         """
-        request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
-            return False
-        return Follow.objects.filter(user=request.user, author=obj).exists()
+        return is_subscribed_to(self.context, obj.pk)
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+class RecipeReadSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор рецепта для чтения с расширенными полями."""
 
     tags = TagSerializer(many=True, read_only=True)
@@ -156,25 +159,26 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         """
         Проверяет, добавлен ли рецепт в избранное текущим пользователем.
         """
-        request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
-            return False
-        return Favorite.objects.filter(
-            user=request.user,
-            recipe=obj,
-        ).exists()
+        return self._get_viewer_flag(obj, 'is_favorited', Favorite)
 
     def get_is_in_shopping_cart(self, obj: Recipe) -> bool:
         """
         Проверяет, находится ли рецепт в списке покупок пользователя.
         """
+        return self._get_viewer_flag(obj, 'is_in_shopping_cart', ShoppingList)
+
+    def _get_viewer_flag(self, obj: Recipe, attr: str, model) -> bool:
+        """
+        Возвращает аннотированный признак рецепта, а при его отсутствии
+        (например, после создания рецепта) выполняет отдельный запрос.
+        """
+        annotated = getattr(obj, attr, None)
+        if annotated is not None:
+            return bool(annotated)
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return False
-        return ShoppingList.objects.filter(
-            user=request.user,
-            recipe=obj,
-        ).exists()
+        return model.objects.filter(user=request.user, recipe=obj).exists()
 
 
 class RecipeWriteSerializer(serializers.ModelSerializer):
@@ -275,6 +279,8 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
     ) -> Recipe:
         """
         Обновляет рецепт и его связи с тегами и ингредиентами.
+        При замене ингредиентов сводные списки покупок всех корзин
+        с этим рецептом пересчитываются на разницу составов.
         """
         ingredients_data = validated_data.pop('ingredients', None)
         tags = validated_data.pop('tags', None)
@@ -285,8 +291,10 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             instance.tags.set(tags)
 
         if ingredients_data is not None:
+            subtract_recipe_from_carts(instance.pk)
             instance.recipe_ingredients.all().delete()
             self._set_ingredients(instance, ingredients_data)
+            add_recipe_to_carts(instance.pk)
 
         return instance
 
@@ -297,6 +305,8 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
     ):
         """
         Создаёт связи RecipeIngredient для указанных ингредиентов.
+        bulk_create не отправляет сигналы, поэтому изменение состава
+        отмечается для индекса подбора рецептов явно.
         """
         bulk = [
             RecipeIngredient(
@@ -307,3 +317,43 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             for item in items
         ]
         RecipeIngredient.objects.bulk_create(bulk)
+        record_recipe_changes([recipe.pk])
+
+
+class CookQuerySerializer(serializers.Serializer):
+    """Параметры подбора рецептов по имеющимся ингредиентам."""
+
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+    )
+    max_missing = serializers.IntegerField(min_value=0, required=False)
+
+    @classmethod
+    def from_query_params(cls, query_params):
+        """
+        Создаёт сериализатор из параметров запроса: ingredients
+        можно передать повтором параметра или через запятую.
+        """
+        ingredients = [
+            value.strip()
+            for param in query_params.getlist('ingredients')
+            for value in param.split(',')
+            if value.strip()
+        ]
+        data = {'ingredients': ingredients}
+        if 'max_missing' in query_params:
+            data['max_missing'] = query_params['max_missing']
+        return cls(data=data)
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список id рецептов для массовых операций."""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(
+            min_value=1, max_value=BigIntegerField.MAX_BIGINT
+        ),
+        allow_empty=False,
+        max_length=BULK_RECIPES_LIMIT,
+    )
@@ -0,0 +1,171 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest, Now
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from core.versioning import (
+    INGREDIENTS_VERSION,
+    POPULARITY_VERSION,
+    RECIPES_VERSION,
+    TAGS_VERSION,
+    bump_version,
+    bump_version_on_commit,
+    viewer_version_name,
+)
+from favorites.models import Favorite
+from recipes.cook_index import record_recipe_changes
+from recipes.documents import CATALOG_VERSION, invalidate_recipe_documents
+from recipes.models import (
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    RecipeTag,
+    Tag,
+    recipe_search_vector,
+)
+from shopping.models import ShoppingList
+
+SEARCH_VECTOR_FIELDS = frozenset(('name', 'text'))
+AUTHOR_DOCUMENT_FIELDS = frozenset(
+    ('email', 'username', 'first_name', 'last_name', 'avatar')
+)
+
+
+def _invalidate_on_commit(recipe_ids):
+    """
+    Сбрасывает документы рецептов после фиксации транзакции,
+    чтобы в кеш не попали данные из незавершённых изменений.
+    """
+    recipe_ids = list(recipe_ids)
+
+    def invalidate():
+        invalidate_recipe_documents(recipe_ids)
+        bump_version(RECIPES_VERSION)
+
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe(sender, instance, **kwargs):
+    """Сбрасывает документ изменённого или удалённого рецепта."""
+    _invalidate_on_commit([instance.pk])
+
+
+@receiver(post_save, sender=Recipe)
+def update_search_vector(sender, instance, update_fields=None, **kwargs):
+    """
+    Пересчитывает поисковый вектор рецепта в той же транзакции.
+    Обновление через update() не вызывает сигнал повторно.
+    """
+    if update_fields and not SEARCH_VECTOR_FIELDS & set(update_fields):
+        return
+    Recipe.objects.filter(pk=instance.pk).update(
+        search_vector=recipe_search_vector()
+    )
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+@receiver(post_save, sender=RecipeTag)
+@receiver(post_delete, sender=RecipeTag)
+def invalidate_recipe_relation(sender, instance, **kwargs):
+    """Сбрасывает документ рецепта при изменении его связей."""
+    _invalidate_on_commit([instance.recipe_id])
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def record_composition_change(sender, instance, **kwargs):
+    """
+    Отмечает изменение состава рецепта для индекса подбора рецептов.
+    """
+    record_recipe_changes([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    """Сбрасывает документы рецептов при изменении тегов через M2M."""
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        _invalidate_on_commit([instance.pk])
+    elif pk_set:
+        _invalidate_on_commit(pk_set)
+    else:
+        bump_version_on_commit(CATALOG_VERSION, RECIPES_VERSION)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_catalog(sender, instance, **kwargs):
+    """
+    Сбрасывает все документы при изменении тега или ингредиента:
+    они входят в документы многих рецептов сразу.
+    """
+    bump_version_on_commit(
+        CATALOG_VERSION,
+        RECIPES_VERSION,
+        TAGS_VERSION if sender is Tag else INGREDIENTS_VERSION,
+    )
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingList)
+@receiver(post_delete, sender=ShoppingList)
+def bump_viewer_state(sender, instance, **kwargs):
+    """
+    Меняет версию состояния пользователя при изменении его избранного
+    или списка покупок: от неё зависят ETag ответов с рецептами.
+    """
+    bump_version_on_commit(viewer_version_name(instance.user_id))
+
+
+@receiver(post_save, sender=Favorite)
+def increment_favorites_count(sender, instance, created, **kwargs):
+    """
+    Увеличивает счётчик избранного рецепта и отмечает время изменения
+    для пересчёта похожих рецептов.
+    """
+    if not created:
+        return
+    Recipe.objects.filter(pk=instance.recipe_id).update(
+        favorites_count=F('favorites_count') + 1,
+        favorites_changed_at=Now(),
+    )
+    bump_version_on_commit(POPULARITY_VERSION)
+
+
+@receiver(post_delete, sender=Favorite)
+def decrement_favorites_count(sender, instance, **kwargs):
+    """
+    Уменьшает счётчик избранного рецепта и отмечает время изменения
+    для пересчёта похожих рецептов.
+    """
+    Recipe.objects.filter(pk=instance.recipe_id).update(
+        favorites_count=Greatest(F('favorites_count') - 1, 0),
+        favorites_changed_at=Now(),
+    )
+    bump_version_on_commit(POPULARITY_VERSION)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_author(sender, instance, created, update_fields=None,
+                      **kwargs):
+    """
+    Сбрасывает документы рецептов автора при изменении его профиля.
+    """
+    if created:
+        return
+    if update_fields and not AUTHOR_DOCUMENT_FIELDS & set(update_fields):
+        return
+    recipe_ids = Recipe.objects.filter(author=instance).values_list(
+        'pk', flat=True
+    )
+    _invalidate_on_commit(recipe_ids)
@@ -0,0 +1,245 @@
+from datetime import timedelta
+from itertools import chain
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from core.arrays import sorted_lookup
+from core.models import Watermark
+from core.versioning import SIMILAR_VERSION, bump_version_on_commit
+from favorites.models import Favorite
+from recipes.models import Recipe, RecipeNeighbour
+
+SIMILAR_WATERMARK = 'recipes:similar'
+NEIGHBOURS_PER_RECIPE = 20
+DEFAULT_SIMILAR_LIMIT = 6
+MIN_COMMON_USERS = 1
+# Сколько пар (рецепт, соседний рецепт) разворачивается за один проход:
+# ограничивает память при расчёте.
+PAIRS_PER_CHUNK = 2_000_000
+LOAD_CHUNK_SIZE = 10_000
+WRITE_BATCH_SIZE = 1000
+# Изменения моложе этого пересчитываются ещё раз при следующем запуске:
+# транзакции, начатые до отметки, успевают зафиксироваться.
+REFRESH_LAG = timedelta(minutes=1)
+
+
+def _ragged(offsets: np.ndarray, values: np.ndarray, rows: np.ndarray):
+    """
+    Разворачивает строки CSR-матрицы: для строк rows возвращает массивы
+    (номер строки в rows, значение) по всем их элементам.
+    """
+    starts = offsets[rows]
+    lengths = offsets[rows + 1] - starts
+    owner = np.repeat(np.arange(len(rows)), lengths)
+    shift = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return owner, values[np.arange(len(owner)) + shift]
+
+
+def _csr(rows: np.ndarray, cols: np.ndarray, size: int):
+    """Строит CSR (смещения, столбцы) из пар, сгруппированных по rows."""
+    order = np.argsort(rows, kind='stable')
+    offsets = np.searchsorted(rows[order], np.arange(size + 1))
+    return offsets, cols[order]
+
+
+class _Matrix:
+    """
+    Разреженная бинарная матрица пользователь × рецепт по избранному
+    в двух CSR-представлениях: по рецептам и по пользователям.
+    """
+
+    def __init__(self, user_ids: np.ndarray, recipe_ids: np.ndarray):
+        """Строит матрицу из пар (пользователь, рецепт)."""
+        users, user_pos = np.unique(user_ids, return_inverse=True)
+        self.recipe_ids, recipe_pos = np.unique(
+            recipe_ids, return_inverse=True
+        )
+        self.item_offsets, self.item_users = _csr(
+            recipe_pos, user_pos, len(self.recipe_ids)
+        )
+        self.user_offsets, self.user_items = _csr(
+            user_pos, recipe_pos, len(users)
+        )
+        self.degrees = np.diff(self.item_offsets).astype(np.float64)
+
+    def chunks(self, targets: np.ndarray) -> Iterator[np.ndarray]:
+        """
+        Делит рецепты на порции так, чтобы число разворачиваемых пар
+        (сумма по пользователям рецепта их числа избранного) в порции
+        не превышало PAIRS_PER_CHUNK.
+        """
+        owner, users = _ragged(self.item_offsets, self.item_users, targets)
+        user_degrees = np.diff(self.user_offsets)
+        cost = np.cumsum(
+            np.bincount(
+                owner, weights=user_degrees[users], minlength=len(targets)
+            )
+        )
+        portion = (cost - 1) // PAIRS_PER_CHUNK
+        bounds = np.flatnonzero(np.diff(portion)) + 1
+        for chunk in np.split(targets, bounds):
+            if len(chunk):
+                yield chunk
+
+    def neighbours(
+        self, targets: np.ndarray, limit: int
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Возвращает до limit ближайших соседей для рецептов targets
+        (позиции в матрице): массивы id рецепта, id соседа и косинусной
+        близости |U₁ ∩ U₂| / √(|U₁|·|U₂|).
+        """
+        owner, users = _ragged(self.item_offsets, self.item_users, targets)
+        via, others = _ragged(self.user_offsets, self.user_items, users)
+        size = len(self.recipe_ids)
+        keys, common = np.unique(
+            owner[via].astype(np.int64) * size + others, return_counts=True
+        )
+        local, others = np.divmod(keys, size)
+        sources = targets[local]
+        keep = (others != sources) & (common >= MIN_COMMON_USERS)
+        local, sources, others, common = (
+            local[keep], sources[keep], others[keep], common[keep]
+        )
+        scores = common / np.sqrt(
+            self.degrees[sources] * self.degrees[others]
+        )
+
+        order = np.lexsort((-self.recipe_ids[others], -scores, local))
+        local = local[order]
+        first = np.flatnonzero(np.r_[True, local[1:] != local[:-1]])
+        rank = np.arange(len(local)) - np.repeat(
+            first, np.diff(np.r_[first, len(local)])
+        )
+        top = order[rank < limit]
+        return (
+            self.recipe_ids[sources[top]],
+            self.recipe_ids[others[top]],
+            scores[top],
+        )
+
+
+def _load_favorites(recipe_ids: Optional[np.ndarray] = None) -> _Matrix:
+    """
+    Загружает избранное в матрицу. Если заданы recipe_ids, берутся
+    только пользователи, добавившие эти рецепты, но со всем их
+    избранным: этого достаточно, чтобы посчитать соседей этих рецептов.
+    """
+    queryset = Favorite.objects.order_by()
+    if recipe_ids is not None:
+        queryset = queryset.filter(
+            user_id__in=Favorite.objects.filter(
+                recipe_id__in=recipe_ids.tolist()
+            ).values('user_id')
+        )
+    pairs = np.fromiter(
+        chain.from_iterable(
+            queryset.values_list('user_id', 'recipe_id').iterator(
+                chunk_size=LOAD_CHUNK_SIZE
+            )
+        ),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    matrix = _Matrix(pairs[:, 0], pairs[:, 1])
+    if recipe_ids is not None:
+        # У соседей в выборке только часть пользователей: полное число
+        # добавлений берётся из поддерживаемого счётчика.
+        counts = dict(
+            Recipe.objects.filter(
+                pk__in=matrix.recipe_ids.tolist()
+            ).values_list('id', 'favorites_count')
+        )
+        matrix.degrees = np.maximum(
+            matrix.degrees,
+            [counts.get(pk, 0) for pk in matrix.recipe_ids.tolist()],
+        )
+    return matrix
+
+
+def _changed_recipes(since) -> np.ndarray:
+    """
+    Рецепты для пересчёта: с изменившимся избранным, те, у кого они
+    сейчас в списке соседей (близость могла упасть), и те, что
+    добавлены в избранное вместе с ними (близость могла вырасти).
+    """
+    changed = list(
+        Recipe.objects.filter(favorites_changed_at__gt=since).values_list(
+            'id', flat=True
+        )
+    )
+    referring = RecipeNeighbour.objects.filter(
+        neighbour_id__in=changed
+    ).values_list('recipe_id', flat=True)
+    co_favorited = (
+        Favorite.objects.filter(
+            user_id__in=Favorite.objects.filter(
+                recipe_id__in=changed
+            ).values('user_id')
+        )
+        .order_by()
+        .values_list('recipe_id', flat=True)
+        .distinct()
+    )
+    return np.unique(
+        np.array(
+            changed + list(referring) + list(co_favorited), dtype=np.int64
+        )
+    )
+
+
+@transaction.atomic
+def build_similar_recipes(full: bool = False) -> int:
+    """
+    Пересчитывает таблицу похожих рецептов RecipeNeighbour.
+
+    Без full пересчитываются только рецепты, избранное которых
+    изменилось после отметки SIMILAR_WATERMARK, и связанные с ними
+    (см. _changed_recipes);
+    при первом запуске и с full — все. Отметка блокируется на время
+    расчёта. Возвращает число пересчитанных рецептов.
+    """
+    watermark, _ = Watermark.objects.select_for_update().get_or_create(
+        name=SIMILAR_WATERMARK
+    )
+    started = timezone.now()
+    if full or watermark.value is None:
+        targets = None
+        RecipeNeighbour.objects.all().delete()
+    else:
+        targets = _changed_recipes(watermark.value)
+        RecipeNeighbour.objects.filter(
+            recipe_id__in=targets.tolist()
+        ).delete()
+
+    processed = 0
+    if targets is None or len(targets):
+        matrix = _load_favorites(targets)
+        if targets is None:
+            positions = np.arange(len(matrix.recipe_ids))
+        else:
+            positions, found = sorted_lookup(matrix.recipe_ids, targets)
+            positions = positions[found]
+        for chunk in matrix.chunks(positions):
+            sources, others, scores = matrix.neighbours(
+                chunk, NEIGHBOURS_PER_RECIPE
+            )
+            RecipeNeighbour.objects.bulk_create(
+                (
+                    RecipeNeighbour(
+                        recipe_id=source, neighbour_id=other, score=score
+                    )
+                    for source, other, score in zip(
+                        sources.tolist(), others.tolist(), scores.tolist()
+                    )
+                ),
+                batch_size=WRITE_BATCH_SIZE,
+            )
+        processed = len(positions) if targets is None else len(targets)
+
+    watermark.value = started - REFRESH_LAG
+    watermark.save(update_fields=('value', 'updated_at'))
+    bump_version_on_commit(SIMILAR_VERSION)
+    return processed
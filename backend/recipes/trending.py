@@ -0,0 +1,176 @@
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Iterable, List, Optional
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import Watermark
+from core.versioning import TRENDING_VERSION, bump_version_on_commit
+from favorites.models import Favorite
+from recipes.models import Recipe, RecipeTrend
+from shopping.models import ShoppingList
+
+TRENDING_WATERMARK = 'recipes:trending'
+# Точка отсчёта оценок: оценка хранится как
+# ln(Σ w · exp(λ · (t − EPOCH))), поэтому порядок рецептов не зависит
+# от момента чтения и старые оценки не нужно «состаривать».
+TRENDING_EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+# Окно → период полураспада в днях.
+TRENDING_WINDOWS = {
+    'day': 1,
+    'week': 7,
+    'month': 30,
+}
+DEFAULT_TRENDING_WINDOW = 'week'
+# Окно, оценка которого копируется в Recipe.trending_score: по ней
+# список рецептов сортируется с ?ordering=trending.
+TRENDING_ORDERING_WINDOW = 'day'
+# Источник → вес одного добавления.
+TRENDING_SOURCES = (
+    (Favorite, 1.0),
+    (ShoppingList, 0.5),
+)
+# Записи моложе этого не обрабатываются: транзакции, начатые раньше
+# отметки, успевают зафиксироваться.
+REFRESH_LAG = timedelta(minutes=1)
+
+
+def score_column(window: str) -> str:
+    """Возвращает имя поля RecipeTrend с оценкой окна."""
+    return f'score_{window}'
+
+
+def decay_rate(window: str) -> float:
+    """Скорость затухания λ окна в 1/с."""
+    return math.log(2) / (TRENDING_WINDOWS[window] * 24 * 60 * 60)
+
+
+def _merge(column: str) -> str:
+    """
+    SQL для сложения оценок в логарифмической шкале:
+    ln(eᵃ + eᵇ) = max(a, b) + ln(1 + e^−|a − b|).
+    """
+    return (
+        f'{column} = CASE WHEN trend.{column} IS NULL '
+        f'THEN EXCLUDED.{column} '
+        f'ELSE GREATEST(trend.{column}, EXCLUDED.{column}) '
+        f'+ LN(1 + EXP(-ABS(trend.{column} - EXCLUDED.{column}))) END'
+    )
+
+
+def _apply_events(since: Optional[datetime], until: datetime) -> List[int]:
+    """
+    Прибавляет к оценкам добавления из (since, until] одним
+    INSERT … SELECT … ON CONFLICT DO UPDATE. Возвращает id
+    затронутых рецептов.
+
+    Сумма экспонент по рецепту считается со сдвигом на его самое
+    позднее событие, поэтому EXP не переполняется.
+    """
+    params = {'epoch': TRENDING_EPOCH, 'until': until}
+    period = 'added_at <= %(until)s'
+    if since is not None:
+        period += ' AND added_at > %(since)s'
+        params['since'] = since
+
+    events = []
+    for number, (model, weight) in enumerate(TRENDING_SOURCES):
+        params[f'weight_{number}'] = math.log(weight)
+        events.append(
+            f'SELECT recipe_id, '
+            f'EXTRACT(EPOCH FROM added_at - %(epoch)s)::float8 AS t, '
+            f'%(weight_{number})s::float8 AS lw '
+            f'FROM {model._meta.db_table} WHERE {period}'
+        )
+    columns, scores = [], []
+    for window in TRENDING_WINDOWS:
+        column = score_column(window)
+        params[f'rate_{window}'] = decay_rate(window)
+        columns.append(column)
+        scores.append(
+            f'%(rate_{window})s * MAX(tmax) + LN(SUM('
+            f'EXP(%(rate_{window})s * (t - tmax) + lw)))'
+        )
+    table = RecipeTrend._meta.db_table
+    union = ' UNION ALL '.join(events)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'''
+            WITH events AS ({union}),
+            shifted AS (
+                SELECT recipe_id, t, lw,
+                    MAX(t) OVER (PARTITION BY recipe_id) AS tmax
+                FROM events
+            )
+            INSERT INTO {table} AS trend (recipe_id, {", ".join(columns)},
+                updated_at)
+            SELECT recipe_id, {", ".join(scores)}, NOW()
+            FROM shifted
+            GROUP BY recipe_id
+            ON CONFLICT (recipe_id) DO UPDATE SET
+                {", ".join(_merge(column) for column in columns)},
+                updated_at = EXCLUDED.updated_at
+            RETURNING recipe_id
+            ''',
+            params,
+        )
+        return [recipe_id for recipe_id, in cursor.fetchall()]
+
+
+def _copy_ordering_scores(recipe_ids: Iterable[int]) -> None:
+    """
+    Копирует оценку окна TRENDING_ORDERING_WINDOW в Recipe.trending_score:
+    так сортировку ?ordering=trending обслуживает индекс
+    idx_recipe_trending, без соединения со сводной таблицей.
+
+    Строки рецептов блокируются в порядке id, как при обновлении
+    счётчика избранного, поэтому запросы не взаимоблокируются.
+    """
+    column = score_column(TRENDING_ORDERING_WINDOW)
+    recipes = Recipe._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'''
+            UPDATE {recipes} AS r SET trending_score = t.{column}
+            FROM {RecipeTrend._meta.db_table} AS t
+            WHERE t.recipe_id = r.id AND r.id IN (
+                SELECT id FROM {recipes} WHERE id = ANY(%s)
+                ORDER BY id FOR UPDATE
+            )
+            ''',
+            [list(recipe_ids)],
+        )
+
+
+@transaction.atomic
+def refresh_trending(rebuild: bool = False) -> int:
+    """
+    Обновляет сводную таблицу трендов добавлениями, появившимися после
+    отметки TRENDING_WATERMARK, и сдвигает отметку. С rebuild таблица
+    строится заново по всей истории. Оценки затронутых рецептов
+    копируются в Recipe.trending_score.
+
+    Отметка блокируется на время обновления, поэтому параллельные
+    запуски не посчитают одни и те же добавления дважды. Возвращает
+    число обновлённых рецептов.
+    """
+    watermark, _ = Watermark.objects.select_for_update().get_or_create(
+        name=TRENDING_WATERMARK
+    )
+    until = timezone.now() - REFRESH_LAG
+    since = watermark.value
+    if rebuild:
+        RecipeTrend.objects.all().delete()
+        Recipe.objects.filter(trending_score__isnull=False).update(
+            trending_score=None
+        )
+        since = None
+    elif since is not None and since >= until:
+        return 0
+    updated = _apply_events(since, until)
+    _copy_ordering_scores(updated)
+    watermark.value = until
+    watermark.save(update_fields=('value', 'updated_at'))
+    bump_version_on_commit(TRENDING_VERSION)
+    return len(updated)
@@ -0,0 +1,252 @@
+import re
+from itertools import islice
+from typing import Iterable, Iterator, List, NamedTuple, Tuple
+
+import numpy as np
+
+from core.arrays import sorted_lookup
+from recipes.ingredient_index import VersionedIngredientIndex, normalize_name
+
+# Единица → (каноническая единица, множитель). Ключи — сжатая запись
+# единицы (см. unit_key): без регистра, пробелов и точек.
+UNIT_CONVERSIONS = {
+    'мг': ('г', 0.001),
+    'г': ('г', 1),
+    'гр': ('г', 1),
+    'грамм': ('г', 1),
+    'кг': ('г', 1000),
+    'мл': ('мл', 1),
+    'л': ('мл', 1000),
+    'литр': ('мл', 1000),
+    'чл': ('мл', 5),
+    'дл': ('мл', 100),
+    'стл': ('мл', 15),
+    'стакан': ('мл', 200),
+    'шт': ('шт', 1),
+    'штука': ('шт', 1),
+    'десяток': ('шт', 10),
+}
+# Крупные единицы для вывода: если сумма в канонической единице
+# не меньше порога, она показывается в более крупной.
+DISPLAY_UNITS = {
+    'г': ('кг', 1000),
+    'мл': ('л', 1000),
+}
+AMOUNT_PRECISION = 3
+
+_UNIT_NOISE = re.compile(r'[\s.]+')
+_SPACES = re.compile(r'\s+')
+
+
+def unit_key(unit: str) -> str:
+    """Сжатая запись единицы: «ст. л.» → «стл», «шт.» → «шт»."""
+    return _UNIT_NOISE.sub('', (unit or '').casefold())
+
+
+def canonical_unit(unit: str) -> Tuple[str, float]:
+    """
+    Возвращает каноническую единицу и множитель перевода в неё.
+    Неизвестные единицы («щепотка», «по вкусу») остаются как есть.
+    """
+    return UNIT_CONVERSIONS.get(unit_key(unit), ((unit or '').strip(), 1))
+
+
+def merge_name(name: str) -> str:
+    """
+    Ключ названия для слияния дублей справочника: регистр, ё → е
+    и схлопнутые пробелы.
+    """
+    return _SPACES.sub(' ', normalize_name(name).replace('ё', 'е'))
+
+
+def round_amount(amount: float):
+    """Округляет количество; целые значения возвращаются как int."""
+    amount = round(float(amount), AMOUNT_PRECISION)
+    if amount.is_integer():
+        amount = int(amount)
+    return amount
+
+
+def format_amount(amount: float, unit: str) -> Tuple[float, str]:
+    """
+    Переводит сумму в крупную единицу, если она достаточно велика,
+    и округляет.
+    """
+    larger = DISPLAY_UNITS.get(unit)
+    if larger is not None and amount >= larger[1]:
+        unit = larger[0]
+        amount = amount / larger[1]
+    return round_amount(amount), unit
+
+
+class _UnitData(NamedTuple):
+    """Отображение ингредиентов на группы слияния."""
+
+    ingredient_ids: np.ndarray
+    groups: np.ndarray
+    factors: np.ndarray
+    unit_ids: np.ndarray
+    units: List[str]
+    labels: List[Tuple[str, str]]
+    ranks: np.ndarray
+
+
+class IngredientUnitIndex(VersionedIngredientIndex):
+    """
+    Соответствие ингредиентов справочника группам слияния.
+
+    Группа — пара (ключ названия, каноническая единица): «сахар, г»
+    и «сахар, кг» попадают в одну группу с множителями 1 и 1000.
+    Массивы упорядочены по id ингредиента; unit_ids — номер записи
+    единицы в units, ranks — место группы в алфавитном порядке.
+    """
+
+    def build(self, entries):
+        """Строит массивы, упорядоченные по id ингредиента."""
+        rows = sorted((row for _, row in entries), key=lambda r: r['id'])
+        keys = {}
+        labels = []
+        units = {}
+        groups = np.empty(len(rows), dtype=np.int64)
+        factors = np.empty(len(rows), dtype=np.float64)
+        unit_ids = np.empty(len(rows), dtype=np.int64)
+        for i, row in enumerate(rows):
+            unit, factor = canonical_unit(row['measurement_unit'])
+            key = (merge_name(row['name']), unit)
+            if key not in keys:
+                keys[key] = len(labels)
+                labels.append((row['name'], unit))
+            groups[i] = keys[key]
+            factors[i] = factor
+            unit_ids[i] = units.setdefault(
+                row['measurement_unit'], len(units)
+            )
+        ranks = np.empty(len(labels), dtype=np.int64)
+        ranks[
+            sorted(
+                range(len(labels)),
+                key=lambda i: (merge_name(labels[i][0]), labels[i][1]),
+            )
+        ] = np.arange(len(labels))
+        return _UnitData(
+            ingredient_ids=np.array(
+                [row['id'] for row in rows], dtype=np.int64
+            ),
+            groups=groups,
+            factors=factors,
+            unit_ids=unit_ids,
+            units=list(units),
+            labels=labels,
+            ranks=ranks,
+        )
+
+    def merge_order(self, ingredient_ids: Iterable[int]):
+        """
+        Упорядочивает id ингредиентов по группам слияния в алфавитном
+        порядке. Возвращает данные индекса и список id: строки,
+        прочитанные в этом порядке, сливает merge.
+        """
+        ids = np.fromiter(ingredient_ids, dtype=np.int64)
+        data = self.get_data()
+        positions, found = sorted_lookup(data.ingredient_ids, ids)
+        if not found.all():
+            # Ингредиенты добавлены после сборки индекса.
+            data = self.get_data(force=True)
+            positions, found = sorted_lookup(data.ingredient_ids, ids)
+        ids, positions = ids[found], positions[found]
+        order = np.lexsort((ids, data.ranks[data.groups[positions]]))
+        return data, ids[order].tolist()
+
+    def merge(
+        self,
+        rows: Iterable[Tuple[int, int]],
+        data,
+        chunk_size: int,
+    ) -> Iterator[dict]:
+        """
+        Сливает строки (ингредиент, количество), упорядоченные
+        по merge_order, и возвращает строки списка покупок по мере
+        чтения.
+
+        Строки обрабатываются порциями по chunk_size: суммы подряд
+        идущих строк одной группы считаются массивами (np.bincount
+        по номеру отрезка), а отрезок на границе порции переносится
+        в следующую.
+        """
+        rows = iter(rows)
+        carry = None
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            for part in _merge_chunk(data, chunk):
+                if carry is not None and carry[0] == part[0]:
+                    part = _join_parts(carry, part)
+                elif carry is not None:
+                    yield _merged_row(data, *carry)
+                carry = part
+        if carry is not None:
+            yield _merged_row(data, *carry)
+
+
+def _merge_chunk(data, chunk) -> List[tuple]:
+    """
+    Сливает подряд идущие строки одной группы в порции. Возвращает
+    отрезки (группа, единица, смешаны ли единицы, сумма, сумма
+    в канонической единице).
+    """
+    ids = np.fromiter((row[0] for row in chunk), np.int64, len(chunk))
+    amounts = np.fromiter((row[1] for row in chunk), np.float64, len(chunk))
+    positions, _ = sorted_lookup(data.ingredient_ids, ids)
+    groups = data.groups[positions]
+    unit_ids = data.unit_ids[positions]
+    starts = np.empty(len(chunk), dtype=bool)
+    starts[0] = True
+    np.not_equal(groups[1:], groups[:-1], out=starts[1:])
+    segments = np.cumsum(starts) - 1
+    first = np.flatnonzero(starts)
+    mixed = np.bincount(
+        segments, weights=unit_ids != unit_ids[first][segments]
+    )
+    raw = np.bincount(segments, weights=amounts)
+    converted = np.bincount(
+        segments, weights=amounts * data.factors[positions]
+    )
+    return list(
+        zip(
+            groups[first].tolist(),
+            unit_ids[first].tolist(),
+            (mixed > 0).tolist(),
+            raw.tolist(),
+            converted.tolist(),
+        )
+    )
+
+
+def _join_parts(left, right) -> tuple:
+    """Объединяет два отрезка одной группы."""
+    group, unit_id, mixed, raw, converted = left
+    return (
+        group,
+        unit_id,
+        mixed or right[2] or right[1] != unit_id,
+        raw + right[3],
+        converted + right[4],
+    )
+
+
+def _merged_row(data, group, unit_id, mixed, raw, converted) -> dict:
+    """
+    Собирает строку списка покупок. Единицы переводятся, только если
+    в группе их несколько; иначе остаётся единица из справочника.
+    """
+    name, unit = data.labels[group]
+    if mixed:
+        amount, unit = format_amount(converted, unit)
+    else:
+        unit = data.units[unit_id]
+        amount = round_amount(raw)
+    return {'name': name, 'amount': amount, 'measurement_unit': unit}
+
+
+ingredient_unit_index = IngredientUnitIndex()
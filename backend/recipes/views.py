@@ -1,32 +1,107 @@
 from __future__ import annotations
 
-from django.db.models import Prefetch, Sum
-from django.http import HttpResponse
+from django.conf import settings
+from django.db.models import (
+    BigIntegerField,
+    BooleanField,
+    Exists,
+    F,
+    OuterRef,
+    Value,
+)
+from django.http import Http404, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
 from rest_framework.response import Response
 
 from api.filters import IngredientFilter, RecipeFilter
+from core.conditional import ConditionalGetMixin
+from core.fields import get_requested_fields
 from core.pagination import CustomPagePagination
+from core.versioning import (
+    INGREDIENTS_VERSION,
+    POPULARITY_VERSION,
+    RECIPES_VERSION,
+    SIMILAR_VERSION,
+    TAGS_VERSION,
+    TRENDING_VERSION,
+)
 from favorites.models import Favorite
-from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.bulk import (
+    STATUS_EXISTS,
+    STATUS_NOT_FOUND,
+    STATUS_REMOVED,
+    bulk_add_recipes,
+    bulk_remove_recipes,
+)
+from recipes.cook_index import cook_index
+from recipes.documents import (
+    RECIPE_FIELDS,
+    VIEWER_FIELDS,
+    get_short_recipe,
+    render_recipes,
+)
+from recipes.facets import get_recipe_facets
+from recipes.ingredient_index import fuzzy_ingredient_index, ingredient_index
+from recipes.ingredient_search import search_ingredients_ranked
+from recipes.models import (
+    Ingredient,
+    Recipe,
+    RecipeNeighbour,
+    RecipeTrend,
+    Tag,
+)
 from recipes.serializers import (
+    CookQuerySerializer,
     IngredientSerializer,
+    RecipeIdsSerializer,
     RecipeReadSerializer,
     RecipeWriteSerializer,
-    ShortRecipeSerializer,
     TagSerializer,
 )
+from recipes.similar import DEFAULT_SIMILAR_LIMIT, NEIGHBOURS_PER_RECIPE
+from recipes.trending import (
+    DEFAULT_TRENDING_WINDOW,
+    TRENDING_WINDOWS,
+    score_column,
+)
+from shopping.export import SHOPPING_LIST_RENDERERS
 from shopping.models import ShoppingList
+from shopping.totals import get_cart_totals, iter_shopping_list
 
 from .permissions import IsAuthorOrReadOnly
 
+ORDERING_QUERY_PARAM = 'ordering'
+DEFAULT_RECIPE_ORDERING = 'newest'
+RECIPE_ORDERINGS = {
+    'newest': ('-id',),
+    'fastest': ('cooking_time', '-id'),
+    'popular': ('-favorites_count', '-id'),
+    'trending': (F('trending_score').desc(nulls_last=True), '-id'),
+}
+
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+def _recipe_id(pk) -> int:
+    """
+    Приводит pk из URL к числу; нечисловой или вне диапазона
+    id — 404, как у get_object().
+    """
+    try:
+        recipe_id = int(pk)
+    except (TypeError, ValueError):
+        raise Http404
+    if not 0 < recipe_id <= BigIntegerField.MAX_BIGINT:
+        raise Http404
+    return recipe_id
+
+
+class TagViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """Просмотр списка тегов и деталей тега (только чтение)."""
 
+    etag_versions = (TAGS_VERSION,)
     queryset = Tag.objects.all().order_by('id')
     serializer_class = TagSerializer
     permission_classes = (permissions.AllowAny,)
@@ -34,9 +109,10 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """Просмотр списка ингредиентов и поиск по имени (только чтение)."""
 
+    etag_versions = (INGREDIENTS_VERSION,)
     queryset = Ingredient.objects.all().order_by('id')
     serializer_class = IngredientSerializer
     permission_classes = (permissions.AllowAny,)
@@ -45,12 +121,62 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
 
+    def get_limit(self):
+        """
+        Возвращает значение параметра limit или None,
+        если параметр не передан или некорректен.
+        """
+        try:
+            limit = int(self.request.query_params.get('limit') or 0)
+        except (TypeError, ValueError):
+            return None
+        return limit if limit > 0 else None
+
+    def list(self, request, *args, **kwargs):
+        """
+        Возвращает ингредиенты. Поиск по началу названия (?name=)
+        обслуживается индексом в памяти процесса без запроса к БД;
+        ?limit= ограничивает число найденных ингредиентов.
+
+        В режиме ?mode=ranked выполняется ранжированный поиск в БД:
+        сначала совпадения по началу, затем по подстроке, внутри групп —
+        по популярности; не больше limit (INGREDIENT_SEARCH_LIMIT).
+        Режим ?mode=fuzzy прощает опечатки, регистр, ё и латинские
+        двойники букв и тоже обслуживается индексом в памяти.
+        """
+        name = request.query_params.get('name')
+        if not name:
+            return super().list(request, *args, **kwargs)
+        limit = self.get_limit()
+        mode = request.query_params.get('mode')
+        if mode == 'ranked':
+            return Response(search_ingredients_ranked(
+                name, limit or settings.INGREDIENT_SEARCH_LIMIT
+            ))
+        if mode == 'fuzzy':
+            return Response(fuzzy_ingredient_index.search(
+                name, limit or settings.INGREDIENT_SEARCH_LIMIT
+            ))
+        return Response(ingredient_index.search(name, limit))
 
-class RecipeViewSet(viewsets.ModelViewSet):
+
+class RecipeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     CRUD для рецептов с поддержкой фильтров, избранного и списка покупок.
     """
 
+    etag_actions = (
+        'list',
+        'retrieve',
+        'cook',
+        'facets',
+        'popular',
+        'similar',
+        'download_shopping_cart',
+        'shopping_cart_preview',
+    )
+    etag_versions = (RECIPES_VERSION,)
+    etag_per_user = True
     permission_classes = (IsAuthorOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
@@ -58,27 +184,276 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """
-        Базовый queryset с оптимизированными выборками.
+        Базовый queryset рецептов.
+        Признаки избранного и списка покупок для текущего пользователя
+        вычисляются аннотациями в основном запросе. Для чтения выбираются
+        только идентификаторы: остальное берётся из кеша документов.
         Фильтрация выполняется через RecipeFilter.
         """
-        return (
-            Recipe.objects.select_related('author').prefetch_related(
-                'tags',
-                Prefetch(
-                    'recipe_ingredients',
-                    queryset=RecipeIngredient.objects.select_related(
-                        'ingredient'
-                    ),
+        ordering = self.get_ordering()
+        queryset = Recipe.objects.all()
+        if self.action in ('list', 'retrieve'):
+            queryset = queryset.only(
+                'id',
+                'author_id',
+                *(
+                    name.lstrip('-')
+                    for name in ordering
+                    if isinstance(name, str)
                 ),
-                'favorited_by',
-                'in_carts',
-            ).order_by('-id')
+            )
+        return self._annotate_viewer_flags(queryset).order_by(*ordering)
+
+    def get_ordering_name(self):
+        """
+        Возвращает имя сортировки из ?ordering=; неизвестные значения
+        заменяются сортировкой по умолчанию.
+        """
+        name = self.request.query_params.get(ORDERING_QUERY_PARAM)
+        return name if name in RECIPE_ORDERINGS else DEFAULT_RECIPE_ORDERING
+
+    def get_ordering(self):
+        """
+        Возвращает поля сортировки: у каждой из RECIPE_ORDERINGS есть
+        составной индекс, заканчивающийся -id для однозначного порядка
+        (у trending — idx_recipe_trending по Recipe.trending_score).
+        """
+        return RECIPE_ORDERINGS[self.get_ordering_name()]
+
+    def get_etag_versions(self):
+        """
+        Добавляет к версиям рецептов версию популярности, если список
+        упорядочен по числу добавлений в избранное, версию трендов
+        для сортировки trending и /popular/ и версию похожих рецептов
+        для /similar/.
+        """
+        if self.action == 'popular':
+            return (RECIPES_VERSION, TRENDING_VERSION)
+        if self.action == 'similar':
+            return (RECIPES_VERSION, SIMILAR_VERSION)
+        if self.action == 'list':
+            name = self.get_ordering_name()
+            if name == 'popular':
+                return (RECIPES_VERSION, POPULARITY_VERSION)
+            if name == 'trending':
+                return (RECIPES_VERSION, TRENDING_VERSION)
+        return self.etag_versions
+
+    def get_requested_fields(self):
+        """
+        Возвращает поля, выбранные параметрами ?fields= и ?omit=,
+        или None, если нужны все поля.
+        """
+        return get_requested_fields(self.request, RECIPE_FIELDS)
+
+    def _annotate_viewer_flags(self, queryset):
+        """
+        Добавляет аннотации is_favorited и is_in_shopping_cart
+        для текущего пользователя через коррелированные EXISTS.
+        Признаки, не запрошенные через ?fields=/?omit=, не вычисляются.
+        """
+        user = self.request.user
+        fields = self.get_requested_fields() or VIEWER_FIELDS
+        models = {
+            'is_favorited': Favorite,
+            'is_in_shopping_cart': ShoppingList,
+        }
+        annotations = {}
+        for name in VIEWER_FIELDS:
+            if name not in fields:
+                continue
+            if user.is_authenticated:
+                annotations[name] = Exists(
+                    models[name].objects.filter(
+                        user=user, recipe=OuterRef('pk')
+                    )
+                )
+            else:
+                annotations[name] = Value(False, output_field=BooleanField())
+        return queryset.annotate(**annotations)
+
+    def list(self, request, *args, **kwargs):
+        """
+        Возвращает страницу рецептов, собранную из кеша документов.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self._render(page))
+        return Response(self._render(queryset))
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Возвращает рецепт, собранный из кеша документов.
+        """
+        return Response(self._render([self.get_object()])[0])
+
+    def _render(self, recipes):
+        """
+        Собирает представление рецептов с учётом текущего пользователя.
+        """
+        return render_recipes(
+            recipes,
+            self.request,
+            self.get_serializer_context(),
+            self.get_requested_fields(),
         )
 
+    @action(detail=False, methods=['get'])
+    def cook(self, request):
+        """
+        Подбирает рецепты по имеющимся ингредиентам (?ingredients=).
+
+        Рецепты ранжируются по числу недостающих ингредиентов: сначала
+        те, для которых есть всё, затем без одного и т. д.; ?max_missing=
+        ограничивает это число. Кандидаты и ранжирование берутся
+        из инвертированного индекса в памяти процесса, из БД читается
+        только текущая страница.
+        """
+        params = CookQuerySerializer.from_query_params(request.query_params)
+        params.is_valid(raise_exception=True)
+        recipe_ids, missing = cook_index.search(
+            params.validated_data['ingredients'],
+            params.validated_data.get('max_missing'),
+        )
+        positions = range(len(recipe_ids))
+        page = self.paginate_queryset(positions)
+        if page is not None:
+            positions = page
+        missing_by_id = {
+            int(recipe_ids[pos]): int(missing[pos]) for pos in positions
+        }
+        recipes = {
+            recipe.pk: recipe
+            for recipe in self._annotate_viewer_flags(
+                Recipe.objects.filter(pk__in=list(missing_by_id))
+                .only('id', 'author_id')
+            )
+        }
+        data = self._render(
+            recipes[pk] for pk in missing_by_id if pk in recipes
+        )
+        for item in data:
+            item['missing_ingredients'] = missing_by_id[item['id']]
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        Возвращает счётчики по тегам, авторам и диапазонам времени
+        готовки для текущего набора фильтров. Результат кешируется
+        по нормализованному набору фильтров до изменения рецептов.
+        """
+        return Response(get_recipe_facets(
+            request,
+            self.filterset_class.base_filters,
+            lambda: self.filter_queryset(Recipe.objects.all()),
+        ))
+
+    @action(detail=False, methods=['get'])
+    def popular(self, request):
+        """
+        Возвращает самые популярные рецепты окна ?window= (day, week,
+        month; по умолчанию week) по оценкам из сводной таблицы
+        RecipeTrend: страница выбирается по индексу окна, из рецептов
+        читается только она.
+        """
+        window = request.query_params.get('window', DEFAULT_TRENDING_WINDOW)
+        if window not in TRENDING_WINDOWS:
+            allowed = ', '.join(TRENDING_WINDOWS)
+            raise ValidationError(
+                {'window': [f'Допустимые значения: {allowed}.']}
+            )
+        column = score_column(window)
+        recipe_ids = (
+            RecipeTrend.objects.filter(**{f'{column}__isnull': False})
+            .order_by(f'-{column}', '-recipe_id')
+            .values_list('recipe_id', flat=True)
+        )
+        page = self.paginate_queryset(recipe_ids)
+        if page is not None:
+            recipe_ids = page
+        recipe_ids = list(recipe_ids)
+        recipes = {
+            recipe.pk: recipe
+            for recipe in self._annotate_viewer_flags(
+                Recipe.objects.filter(pk__in=recipe_ids)
+                .only('id', 'author_id')
+            )
+        }
+        data = self._render(
+            recipes[pk] for pk in recipe_ids if pk in recipes
+        )
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """
+        Возвращает рецепты, которые добавляли в избранное вместе с этим
+        (?limit=, по умолчанию DEFAULT_SIMILAR_LIMIT, не больше
+        NEIGHBOURS_PER_RECIPE). Соседи заранее
+        посчитаны командой build_similar_recipes и читаются одним
+        запросом по индексу.
+        """
+        recipe_id = _recipe_id(pk)
+        try:
+            limit = int(request.query_params.get('limit') or 0)
+        except ValueError:
+            limit = 0
+        if limit <= 0:
+            limit = DEFAULT_SIMILAR_LIMIT
+        limit = min(limit, NEIGHBOURS_PER_RECIPE)
+        neighbour_ids = list(
+            RecipeNeighbour.objects.filter(recipe_id=recipe_id)
+            .order_by('-score', '-neighbour_id')
+            .values_list('neighbour_id', flat=True)[:limit]
+        )
+        if not neighbour_ids and not Recipe.objects.filter(
+            pk=recipe_id
+        ).exists():
+            raise Http404
+        recipes = {
+            recipe.pk: recipe
+            for recipe in self._annotate_viewer_flags(
+                Recipe.objects.filter(pk__in=neighbour_ids)
+                .only('id', 'author_id')
+            )
+        }
+        return Response(self._render(
+            recipes[neighbour_id]
+            for neighbour_id in neighbour_ids
+            if neighbour_id in recipes
+        ))
+
+    def get_cursor_ordering(self):
+        """
+        Возвращает ключ сортировки для курсорной пагинации списка.
+        Результаты поиска упорядочены по релевантности, а trending —
+        по полю, где NULL идут в конце, поэтому курсорную пагинацию для
+        них не поддерживаем.
+        """
+        if self.action != 'list' or self.request.query_params.get(
+            'search'
+        ):
+            return None
+        ordering = self.get_ordering()
+        if all(isinstance(name, str) for name in ordering):
+            return ordering
+        return None
+
     def get_permissions(self):
         """
         Возвращает набор прав в зависимости от действия и HTTP-метода.
+        Права, заданные в @action(permission_classes=...), имеют
+        приоритет.
         """
+        handler = getattr(self, self.action, None) if self.action else None
+        if 'permission_classes' in getattr(handler, 'kwargs', {}):
+            return super().get_permissions()
         if self.request.method in SAFE_METHODS:
             return [IsAuthorOrReadOnly()]
         if self.action in ('create', 'update', 'partial_update', 'destroy'):
@@ -89,10 +464,48 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """
         Выбирает сериализатор для чтения или записи рецепта.
         """
-        if self.action in ('list', 'retrieve'):
+        if self.action in ('list', 'retrieve', 'cook'):
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
+    def _add_to_list(self, pk, model, exists_message):
+        """
+        Добавляет рецепт в избранное или список покупок без get_object():
+        проверка рецепта и вставка выполняются одним INSERT … ON CONFLICT
+        DO NOTHING, поэтому повторные и параллельные запросы не приводят
+        к IntegrityError. Ответ собирается узким запросом values().
+        """
+        recipe_id = _recipe_id(pk)
+        result = bulk_add_recipes(model, self.request.user.pk, [recipe_id])
+        if result[recipe_id] == STATUS_NOT_FOUND:
+            raise Http404
+        if result[recipe_id] == STATUS_EXISTS:
+            return Response(
+                {'detail': exists_message},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(
+            get_short_recipe(recipe_id), status=status.HTTP_201_CREATED
+        )
+
+    def _remove_from_list(self, pk, model, absent_message):
+        """
+        Удаляет рецепт из избранного или списка покупок одним DELETE;
+        существование рецепта проверяется, только если удалять нечего.
+        """
+        recipe_id = _recipe_id(pk)
+        result = bulk_remove_recipes(
+            model, self.request.user.pk, [recipe_id]
+        )
+        if result[recipe_id] == STATUS_REMOVED:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        if not Recipe.objects.filter(pk=recipe_id).exists():
+            raise Http404
+        return Response(
+            {'detail': absent_message},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
     @action(
         detail=True,
         methods=['post'],
@@ -102,35 +515,16 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """
         Добавляет рецепт в избранное текущего пользователя.
         """
-        recipe = self.get_object()
-        obj, created = Favorite.objects.get_or_create(
-            user=request.user,
-            recipe=recipe,
-        )
-        if not created:
-            return Response(
-                {'detail': 'Рецепт уже в избранном.'},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        data = ShortRecipeSerializer(recipe).data
-        return Response(data, status=status.HTTP_201_CREATED)
+        return self._add_to_list(pk, Favorite, 'Рецепт уже в избранном.')
 
     @favorite.mapping.delete
     def favorite_delete(self, request, pk=None):
         """
         Удаляет рецепт из избранного текущего пользователя.
         """
-        recipe = self.get_object()
-        deleted, _ = Favorite.objects.filter(
-            user=request.user,
-            recipe=recipe,
-        ).delete()
-        if not deleted:
-            return Response(
-                {'detail': 'Этого рецепта не было в избранном.'},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        return self._remove_from_list(
+            pk, Favorite, 'Этого рецепта не было в избранном.'
+        )
 
     @action(
         detail=True,
@@ -142,78 +536,101 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """
         Добавляет рецепт в список покупок текущего пользователя.
         """
-        recipe = self.get_object()
-        obj, created = ShoppingList.objects.get_or_create(
-            user=request.user,
-            recipe=recipe,
+        return self._add_to_list(
+            pk, ShoppingList, 'Рецепт уже в списке покупок.'
         )
-        if not created:
-            return Response(
-                {'detail': 'Рецепт уже в списке покупок.'},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        data = ShortRecipeSerializer(recipe).data
-        return Response(data, status=status.HTTP_201_CREATED)
 
     @shopping_cart.mapping.delete
     def shopping_cart_delete(self, request, pk=None):
         """
         Удаляет рецепт из списка покупок текущего пользователя.
         """
-        recipe = self.get_object()
-        deleted, _ = ShoppingList.objects.filter(
-            user=request.user,
-            recipe=recipe,
-        ).delete()
-        if not deleted:
-            return Response(
-                {'detail': 'Этого рецепта не было в списке покупок.'},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        return self._remove_from_list(
+            pk, ShoppingList, 'Этого рецепта не было в списке покупок.'
+        )
+
+    def _bulk(self, request, model):
+        """
+        Добавляет (POST) или удаляет (DELETE) рецепты из списка ids
+        одним запросом и возвращает статус каждого id.
+        """
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        operation = (
+            bulk_add_recipes if request.method == 'POST'
+            else bulk_remove_recipes
+        )
+        statuses = operation(
+            model, request.user.pk, serializer.validated_data['ids']
+        )
+        return Response({
+            'results': [
+                {'id': pk, 'status': value} for pk, value in statuses.items()
+            ]
+        })
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=[permissions.IsAuthenticated],
+        url_path='favorite/bulk',
+    )
+    def favorite_bulk(self, request):
+        """Массово добавляет рецепты в избранное или удаляет их."""
+        return self._bulk(request, Favorite)
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=[permissions.IsAuthenticated],
+        url_path='shopping_cart/bulk',
+    )
+    def shopping_cart_bulk(self, request):
+        """Массово добавляет рецепты в список покупок или удаляет их."""
+        return self._bulk(request, ShoppingList)
 
     @action(
         detail=False,
         methods=['get'],
         permission_classes=[permissions.IsAuthenticated],
+        renderer_classes=SHOPPING_LIST_RENDERERS,
         url_path='download_shopping_cart',
     )
     def download_shopping_cart(self, request):
         """
-        Формирует текстовый файл со сводным списком покупок пользователя.
-        """
-        recipe_ids = ShoppingList.objects.filter(
-            user=request.user
-        ).values_list('recipe_id', flat=True)
-
-        rows = (
-            RecipeIngredient.objects
-            .filter(recipe_id__in=recipe_ids)
-            .values(
-                'ingredient__name',
-                'ingredient__measurement_unit',
-            )
-            .annotate(total_amount=Sum('amount'))
-            .order_by('ingredient__name')
-        )
+        Выгружает сводный список покупок пользователя в формате из
+        ?format= (txt по умолчанию, csv, md, pdf).
 
-        lines = []
-        for row in rows:
-            name = row['ingredient__name']
-            unit = row['ingredient__measurement_unit']
-            amount = row['total_amount']
-            lines.append(f'{name}: {amount} {unit}')
-
-        content = '\n'.join(lines) if lines else 'Список покупок пуст.'
-        response = HttpResponse(
-            content,
-            content_type='text/plain; charset=utf-8',
+        Количества сливаются по канонической единице (г и кг, мл и л)
+        и дублям справочника. Файл формируется потоком по мере вывода
+        строк.
+        """
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(iter_shopping_list(request.user.pk)),
+            content_type=(
+                f'{renderer.media_type}; charset={renderer.charset}'
+                if renderer.charset
+                else renderer.media_type
+            ),
         )
         response['Content-Disposition'] = (
-            'attachment; filename="shopping_list.txt"'
+            f'attachment; filename="{renderer.filename}"'
         )
         return response
 
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[permissions.IsAuthenticated],
+        url_path='shopping_cart_preview',
+    )
+    def shopping_cart_preview(self, request):
+        """
+        Возвращает сводный список покупок пользователя в JSON.
+        """
+        return Response(get_cart_totals(request.user.pk))
+
     @action(detail=True, methods=['get'], url_path='get-link')
     def get_link(self, request, pk=None):
         """
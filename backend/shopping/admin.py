@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import ShoppingList
+from .models import CartIngredient, ShoppingList
 
 
 @admin.register(ShoppingList)
@@ -11,3 +11,20 @@ class ShoppingListAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'user__email', 'recipe__name')
     list_select_related = ('user', 'recipe')
     ordering = ('-added_at',)
+
+
+@admin.register(CartIngredient)
+class CartIngredientAdmin(admin.ModelAdmin):
+    """Сводные списки покупок (только просмотр)."""
+
+    list_display = ('user', 'ingredient', 'amount')
+    search_fields = ('user__username', 'user__email', 'ingredient__name')
+    list_select_related = ('user', 'ingredient')
+
+    def has_add_permission(self, request):
+        """Строки создаются только пересчётом."""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        """Строки изменяются только пересчётом."""
+        return False
@@ -7,3 +7,7 @@ class ShoppingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'shopping'
     verbose_name = 'Список покупок'
+
+    def ready(self):
+        """Импортирует сигналы при загрузке приложения."""
+        from . import signals  # noqa: F401
@@ -0,0 +1,194 @@
+import csv
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, Iterator
+
+from rest_framework.renderers import BaseRenderer
+
+from shopping.pdf import stream_pdf
+
+EXPORT_TITLE = 'Список покупок'
+EMPTY_MESSAGE = 'Список покупок пуст.'
+BUFFER_SIZE = 8192
+
+
+def _buffered(pieces: Iterable[str], size: int = BUFFER_SIZE):
+    """
+    Склеивает мелкие фрагменты в куски около size символов, чтобы
+    не отдавать серверу по одной строке за раз. Первый фрагмент
+    отдаётся сразу: клиент получает начало файла до конца выгрузки.
+    """
+    pieces = iter(pieces)
+    for piece in pieces:
+        yield piece
+        break
+    buffer, length = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def _message(data) -> str:
+    """Достаёт текст из обычного ответа DRF (например, ошибки)."""
+    if isinstance(data, dict) and 'detail' in data:
+        return str(data['detail'])
+    return str(data)
+
+
+class ShoppingListRenderer(ABC, BaseRenderer):
+    """
+    Базовый рендерер выгрузки списка покупок.
+
+    Выгрузка формируется потоком: stream() получает строки сводного
+    списка по мере чтения из БД и отдаёт готовые фрагменты файла.
+    Обычные ответы DRF (ошибки, 304) рендерятся как сообщение в том же
+    формате.
+    """
+
+    charset = 'utf-8'
+    extension = None
+
+    @abstractmethod
+    def stream_text(
+        self, rows: Iterable[Dict[str, Any]], message: str
+    ) -> Iterator[str]:
+        """Возвращает фрагменты текста выгрузки."""
+
+    def stream(
+        self, rows: Iterable[Dict[str, Any]], message: str = EMPTY_MESSAGE
+    ) -> Iterator[bytes]:
+        """
+        Возвращает фрагменты файла в байтах; message выводится,
+        если строк нет.
+        """
+        for chunk in _buffered(self.stream_text(rows, message)):
+            yield chunk.encode(self.charset)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Рендерит обычный ответ DRF как выгрузку без строк."""
+        if data is None:
+            return b''
+        return b''.join(self.stream([], _message(data)))
+
+    @property
+    def filename(self) -> str:
+        """Имя файла выгрузки."""
+        return f'shopping_list.{self.extension}'
+
+
+class TextShoppingListRenderer(ShoppingListRenderer):
+    """Выгрузка в текст: «название: количество единица» по строке."""
+
+    media_type = 'text/plain'
+    format = 'txt'
+    extension = 'txt'
+
+    def stream_text(self, rows, message):
+        """Строки разделяются переводом строки, как раньше."""
+        separator = ''
+        for row in rows:
+            yield (
+                f'{separator}{row["name"]}: {row["amount"]} '
+                f'{row["measurement_unit"]}'
+            )
+            separator = '\n'
+        if not separator:
+            yield message
+
+
+class _Line:
+    """Буфер для csv.writer: writerow возвращает записанную строку."""
+
+    def write(self, value):
+        """Возвращает строку вместо записи."""
+        return value
+
+
+class CsvShoppingListRenderer(ShoppingListRenderer):
+    """Выгрузка в CSV с заголовком."""
+
+    media_type = 'text/csv'
+    format = 'csv'
+    extension = 'csv'
+
+    def stream_text(self, rows, message):
+        """
+        Заголовок и по строке CSV на ингредиент; если строк нет,
+        сообщение выводится первой ячейкой.
+        """
+        writer = csv.writer(_Line())
+        yield writer.writerow(('Ингредиент', 'Количество', 'Единица'))
+        empty = True
+        for row in rows:
+            empty = False
+            yield writer.writerow(
+                (row['name'], row['amount'], row['measurement_unit'])
+            )
+        if empty:
+            yield writer.writerow((message,))
+
+
+def _markdown_cell(value) -> str:
+    """Экранирует значение для ячейки таблицы Markdown."""
+    return str(value).replace('\\', '\\\\').replace('|', '\\|')
+
+
+class MarkdownShoppingListRenderer(ShoppingListRenderer):
+    """Выгрузка в Markdown: заголовок и таблица."""
+
+    media_type = 'text/markdown'
+    format = 'md'
+    extension = 'md'
+
+    def stream_text(self, rows, message):
+        """Таблица выводится, только если есть строки."""
+        yield f'# {EXPORT_TITLE}\n\n'
+        empty = True
+        for row in rows:
+            if empty:
+                yield '| Ингредиент | Количество | Единица |\n'
+                yield '| --- | ---: | --- |\n'
+                empty = False
+            yield (
+                f'| {_markdown_cell(row["name"])} | {row["amount"]} '
+                f'| {_markdown_cell(row["measurement_unit"])} |\n'
+            )
+        if empty:
+            yield f'{message}\n'
+
+
+class PdfShoppingListRenderer(ShoppingListRenderer):
+    """Выгрузка в PDF со встроенным шрифтом (см. shopping.pdf)."""
+
+    media_type = 'application/pdf'
+    format = 'pdf'
+    extension = 'pdf'
+    charset = None
+
+    def stream_text(self, rows, message):
+        """Строки документа: «название: количество единица»."""
+        empty = True
+        for row in rows:
+            empty = False
+            yield (
+                f'{row["name"]}: {row["amount"]} '
+                f'{row["measurement_unit"]}'
+            )
+        if empty:
+            yield message
+
+    def stream(self, rows, message=EMPTY_MESSAGE):
+        """Страницы PDF отдаются по мере заполнения."""
+        return stream_pdf(EXPORT_TITLE, self.stream_text(rows, message))
+
+
+SHOPPING_LIST_RENDERERS = (
+    TextShoppingListRenderer,
+    CsvShoppingListRenderer,
+    MarkdownShoppingListRenderer,
+    PdfShoppingListRenderer,
+)
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from shopping.models import CartIngredient
+from shopping.totals import rebuild_cart_totals
+
+
+class Command(BaseCommand):
+    """
+    Команда для пересчёта сводных списков покупок с нуля.
+
+    Нужна после изменений корзин или рецептов в обход API и админки,
+    например массовых правок в shell или SQL.
+    """
+
+    help = 'Пересчитывает сводные списки покупок пользователей.'
+
+    def add_arguments(self, parser):
+        """Добавляет аргумент со списком пользователей."""
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='users',
+            help='ID пользователя; можно указать несколько раз.',
+        )
+
+    def handle(self, *args, **opts):
+        """Пересчитывает сводные списки и выводит число строк."""
+        rebuild_cart_totals(opts['users'])
+        queryset = CartIngredient.objects.all()
+        if opts['users']:
+            queryset = queryset.filter(user_id__in=opts['users'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Строк в сводных списках: {queryset.count()}')
+        )
@@ -0,0 +1,73 @@
+# Generated by Django 5.1.1 on 2026-10-16 23:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_cart_totals(apps, schema_editor):
+    schema_editor.execute(
+        """
+        INSERT INTO shopping_cartingredient (user_id, ingredient_id, amount)
+        SELECT c.user_id, ri.ingredient_id, SUM(ri.amount)
+        FROM shopping_shoppinglist c
+        JOIN recipes_recipeingredient ri ON ri.recipe_id = c.recipe_id
+        GROUP BY c.user_id, ri.ingredient_id
+        """
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0005_recipe_favorites_count"),
+        ("shopping", "0002_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CartIngredient",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("amount", models.BigIntegerField(verbose_name="Количество")),
+                (
+                    "ingredient",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="in_cart_totals",
+                        to="recipes.ingredient",
+                        verbose_name="Ингредиент",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="cart_ingredients",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Ингредиент списка покупок",
+                "verbose_name_plural": "Сводный список покупок",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "ingredient"),
+                        name="unique_user_cart_ingredient",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(fill_cart_totals, migrations.RunPython.noop),
+    ]
@@ -2,7 +2,7 @@ from django.conf import settings
 from django.db import models
 from django.db.models import UniqueConstraint
 
-from recipes.models import Recipe
+from recipes.models import Ingredient, Recipe
 
 
 class ShoppingList(models.Model):
@@ -46,3 +46,43 @@ class ShoppingList(models.Model):
     def __str__(self):
         """Возвращает строковое представление записи."""
         return f'{self.user} → {self.recipe}'
+
+
+class CartIngredient(models.Model):
+    """
+    Сводный список покупок: суммарное количество ингредиента
+    во всех рецептах корзины пользователя.
+
+    Таблица обновляется инкрементально (shopping.totals) при изменении
+    корзины и состава рецептов в ней.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='cart_ingredients',
+        verbose_name='Пользователь',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='in_cart_totals',
+        verbose_name='Ингредиент',
+    )
+    amount = models.BigIntegerField('Количество')
+
+    class Meta:
+        """Метаданные модели CartIngredient."""
+
+        constraints = [
+            UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_user_cart_ingredient',
+            )
+        ]
+        verbose_name = 'Ингредиент списка покупок'
+        verbose_name_plural = 'Сводный список покупок'
+
+    def __str__(self):
+        """Возвращает строковое представление записи."""
+        return f'{self.user}: {self.ingredient} × {self.amount}'
@@ -0,0 +1,539 @@
+import hashlib
+import struct
+import threading
+import zlib
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Set
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+DEFAULT_FONT_PATH = '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+MARGIN = 50
+FONT_SIZE = 11
+TITLE_SIZE = 14
+LEADING = 16
+TO_UNICODE_BLOCK = 100
+
+# Номера объектов, которые не зависят от числа страниц.
+CATALOG_ID = 1
+PAGES_ID = 2
+FONT_ID = 3
+FIRST_PAGE_ID = 8
+
+# Таблицы, которые нужны встроенному TrueType-шрифту в PDF.
+SUBSET_TABLES = (
+    b'cvt ', b'fpgm', b'glyf', b'head', b'hhea', b'hmtx', b'loca', b'maxp',
+    b'prep',
+)
+# Флаги компонентов составного глифа (таблица glyf).
+ARG_1_AND_2_ARE_WORDS = 0x0001
+WE_HAVE_A_SCALE = 0x0008
+MORE_COMPONENTS = 0x0020
+WE_HAVE_AN_X_AND_Y_SCALE = 0x0040
+WE_HAVE_A_TWO_BY_TWO = 0x0080
+
+
+class _Lookup(dict):
+    """Словарь по коду символа со значением для отсутствующих символов."""
+
+    def __init__(self, items, default):
+        """Создаёт словарь с значением default для неизвестных ключей."""
+        super().__init__(items)
+        self.default = default
+
+    def __missing__(self, key):
+        """Символа нет в шрифте: используется глиф .notdef."""
+        return self.default
+
+
+class _Font(NamedTuple):
+    """
+    Разобранный TrueType-шрифт.
+
+    codes переводит символ в номер глифа (4 hex-цифры, для
+    str.translate), advances — в ширину глифа в тысячных долях кегля.
+    В документ встраиваются только использованные глифы (_font_objects).
+    """
+
+    name: str
+    codes: _Lookup
+    advances: _Lookup
+    glyphs: Dict[int, int]
+    widths: List[int]
+    tables: Dict[bytes, bytes]
+    locations: List[int]
+    descriptor: str
+
+
+def _tables(data: bytes) -> Dict[bytes, bytes]:
+    """Возвращает таблицы TrueType-файла по их тегам."""
+    num_tables = struct.unpack_from('>H', data, 4)[0]
+    tables = {}
+    for i in range(num_tables):
+        tag, _, offset, length = struct.unpack_from(
+            '>4sIII', data, 12 + 16 * i
+        )
+        tables[tag] = data[offset:offset + length]
+    return tables
+
+
+def _cmap(table: bytes) -> Dict[int, int]:
+    """
+    Читает из таблицы cmap юникодную подтаблицу формата 4
+    (базовая многоязычная плоскость): код символа → номер глифа.
+    """
+    count = struct.unpack_from('>H', table, 2)[0]
+    offset = None
+    for i in range(count):
+        platform, encoding, sub = struct.unpack_from(
+            '>HHI', table, 4 + 8 * i
+        )
+        if (platform, encoding) in ((3, 1), (0, 3)):
+            if struct.unpack_from('>H', table, sub)[0] == 4:
+                offset = sub
+                break
+    if offset is None:
+        raise ImproperlyConfigured(
+            'В шрифте для PDF нет юникодной таблицы cmap формата 4.'
+        )
+
+    seg_count = struct.unpack_from('>H', table, offset + 6)[0] // 2
+    ends_at = offset + 14
+    starts_at = ends_at + 2 * seg_count + 2
+    deltas_at = starts_at + 2 * seg_count
+    ranges_at = deltas_at + 2 * seg_count
+    glyphs = {}
+    for seg in range(seg_count):
+        end = struct.unpack_from('>H', table, ends_at + 2 * seg)[0]
+        start = struct.unpack_from('>H', table, starts_at + 2 * seg)[0]
+        delta = struct.unpack_from('>h', table, deltas_at + 2 * seg)[0]
+        range_at = ranges_at + 2 * seg
+        range_offset = struct.unpack_from('>H', table, range_at)[0]
+        for code in range(start, min(end, 0xFFFE) + 1):
+            if range_offset:
+                at = range_at + range_offset + 2 * (code - start)
+                glyph = struct.unpack_from('>H', table, at)[0]
+                if glyph:
+                    glyph = (glyph + delta) & 0xFFFF
+            else:
+                glyph = (code + delta) & 0xFFFF
+            if glyph:
+                glyphs[code] = glyph
+    return glyphs
+
+
+def _stream(dictionary: str, data: bytes) -> bytes:
+    """Собирает сжатый поток PDF."""
+    data = zlib.compress(data)
+    return (
+        f'<< {dictionary} /Length {len(data)} /Filter /FlateDecode >>\n'
+        'stream\n'
+    ).encode('latin-1') + data + b'\nendstream'
+
+
+def _to_unicode(glyphs: Dict[int, int]) -> bytes:
+    """Строит CMap ToUnicode, чтобы текст из PDF можно было копировать."""
+    pairs = {}
+    for code, glyph in sorted(glyphs.items()):
+        pairs.setdefault(glyph, code)
+    pairs = sorted(pairs.items())
+    lines = [
+        '/CIDInit /ProcSet findresource begin',
+        '12 dict begin',
+        'begincmap',
+        '/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) '
+        '/Supplement 0 >> def',
+        '/CMapName /Adobe-Identity-UCS def',
+        '/CMapType 2 def',
+        '1 begincodespacerange',
+        '<0000> <FFFF>',
+        'endcodespacerange',
+    ]
+    for i in range(0, len(pairs), TO_UNICODE_BLOCK):
+        block = pairs[i:i + TO_UNICODE_BLOCK]
+        lines.append(f'{len(block)} beginbfchar')
+        lines.extend(
+            f'<{glyph:04X}> <{code:04X}>' for glyph, code in block
+        )
+        lines.append('endbfchar')
+    lines.extend([
+        'endcmap',
+        'CMapName currentdict /CMap defineresource pop',
+        'end',
+        'end',
+    ])
+    return '\n'.join(lines).encode('ascii')
+
+
+def _load_font(path: str) -> _Font:
+    """
+    Разбирает TrueType-шрифт: таблицы, смещения глифов, ширины,
+    соответствие символов глифам и метрики для описания шрифта.
+    """
+    try:
+        with open(path, 'rb') as file:
+            data = file.read()
+    except OSError as error:
+        raise ImproperlyConfigured(
+            f'Не найден шрифт для PDF: {path}. '
+            f'Укажите путь в SHOPPING_PDF_FONT_PATH.'
+        ) from error
+
+    try:
+        tables = _tables(data)
+        head, hhea, hmtx = tables[b'head'], tables[b'hhea'], tables[b'hmtx']
+        units = struct.unpack_from('>H', head, 18)[0]
+        bbox = [
+            v * 1000 // units for v in struct.unpack_from('>4h', head, 36)
+        ]
+        long_locations = struct.unpack_from('>h', head, 50)[0]
+        ascent, descent = struct.unpack_from('>hh', hhea, 4)
+        metrics_count = struct.unpack_from('>H', hhea, 34)[0]
+        glyph_count = struct.unpack_from('>H', tables[b'maxp'], 4)[0]
+        advances = [
+            struct.unpack_from('>H', hmtx, 4 * i)[0] * 1000 // units
+            for i in range(metrics_count)
+        ]
+        if long_locations:
+            locations = list(
+                struct.unpack_from(f'>{glyph_count + 1}I', tables[b'loca'])
+            )
+        else:
+            locations = [
+                2 * value for value in struct.unpack_from(
+                    f'>{glyph_count + 1}H', tables[b'loca']
+                )
+            ]
+        glyphs = _cmap(tables[b'cmap'])
+    except (KeyError, IndexError, struct.error) as error:
+        raise ImproperlyConfigured(
+            f'Не удалось разобрать шрифт для PDF: {path}.'
+        ) from error
+    widths = advances + [advances[-1]] * (glyph_count - metrics_count)
+
+    return _Font(
+        name=path.rsplit('/', 1)[-1].rsplit('.', 1)[0].replace(' ', ''),
+        codes=_Lookup(
+            ((code, f'{glyph:04X}') for code, glyph in glyphs.items()),
+            '0000',
+        ),
+        advances=_Lookup(
+            ((code, widths[glyph]) for code, glyph in glyphs.items()),
+            widths[0],
+        ),
+        glyphs=glyphs,
+        widths=widths,
+        tables={
+            tag: table for tag, table in tables.items()
+            if tag in SUBSET_TABLES
+        },
+        locations=locations,
+        descriptor=(
+            f'/Flags 32 /FontBBox [{" ".join(map(str, bbox))}] '
+            f'/ItalicAngle 0 /Ascent {ascent * 1000 // units} '
+            f'/Descent {descent * 1000 // units} '
+            f'/CapHeight {ascent * 1000 // units} /StemV 80'
+        ),
+    )
+
+
+def _components(glyph: bytes) -> List[int]:
+    """Возвращает номера глифов, из которых собран составной глиф."""
+    if len(glyph) < 10 or struct.unpack_from('>h', glyph)[0] >= 0:
+        return []
+    components, at = [], 10
+    while True:
+        flags, index = struct.unpack_from('>HH', glyph, at)
+        components.append(index)
+        at += 8 if flags & ARG_1_AND_2_ARE_WORDS else 6
+        if flags & WE_HAVE_A_SCALE:
+            at += 2
+        elif flags & WE_HAVE_AN_X_AND_Y_SCALE:
+            at += 4
+        elif flags & WE_HAVE_A_TWO_BY_TWO:
+            at += 8
+        if not flags & MORE_COMPONENTS:
+            return components
+
+
+def _checksum(data: bytes) -> int:
+    """Контрольная сумма таблицы TrueType."""
+    data += b'\0' * (-len(data) % 4)
+    return sum(struct.unpack(f'>{len(data) // 4}I', data)) & 0xFFFFFFFF
+
+
+def _font_file(tables: Dict[bytes, bytes]) -> bytes:
+    """Собирает файл TrueType из таблиц с каталогом и контрольными суммами."""
+    count = len(tables)
+    power = 1 << (count.bit_length() - 1)
+    directory = [
+        struct.pack(
+            '>IHHHH', 0x00010000, count, power * 16,
+            power.bit_length() - 1, (count - power) * 16,
+        )
+    ]
+    body = []
+    offset = 12 + 16 * count
+    head_at = None
+    for tag, data in sorted(tables.items()):
+        directory.append(
+            struct.pack('>4sIII', tag, _checksum(data), offset, len(data))
+        )
+        if tag == b'head':
+            head_at = offset
+        data += b'\0' * (-len(data) % 4)
+        body.append(data)
+        offset += len(data)
+    file = bytearray(b''.join(directory + body))
+    adjustment = (0xB1B0AFBA - _checksum(bytes(file))) & 0xFFFFFFFF
+    struct.pack_into('>I', file, head_at + 8, adjustment)
+    return bytes(file)
+
+
+def _subset(font: _Font, used: Iterable[int]) -> bytes:
+    """
+    Возвращает файл шрифта только с глифами used (и их компонентами).
+
+    Номера глифов сохраняются: остальные глифы становятся пустыми,
+    поэтому коды в тексте и CIDToGIDMap /Identity не меняются.
+    """
+    glyf, locations = font.tables[b'glyf'], font.locations
+    keep = {0, *used}
+    pending = list(keep)
+    while pending:
+        gid = pending.pop()
+        for part in _components(glyf[locations[gid]:locations[gid + 1]]):
+            if part not in keep:
+                keep.add(part)
+                pending.append(part)
+
+    parts, offsets, position = [], [], 0
+    for gid in range(len(locations) - 1):
+        offsets.append(position)
+        if gid in keep:
+            data = glyf[locations[gid]:locations[gid + 1]]
+            data += b'\0' * (-len(data) % 4)
+            parts.append(data)
+            position += len(data)
+    offsets.append(position)
+
+    head = bytearray(font.tables[b'head'])
+    struct.pack_into('>I', head, 8, 0)
+    struct.pack_into('>h', head, 50, 1)
+    return _font_file({
+        **font.tables,
+        b'head': bytes(head),
+        b'glyf': b''.join(parts),
+        b'loca': struct.pack(f'>{len(offsets)}I', *offsets),
+    })
+
+
+def _font_objects(font: _Font, chars: Set[int]) -> Dict[int, bytes]:
+    """
+    Готовит объекты PDF для встраивания подмножества шрифта с символами
+    chars: Type0-шрифт с кодировкой Identity-H, CID-шрифт с ширинами
+    глифов, описание шрифта, файл шрифта и CMap ToUnicode.
+    """
+    glyphs = {code: font.glyphs[code] for code in chars if code in font.glyphs}
+    used = sorted({0, *glyphs.values()})
+    digest = hashlib.md5(' '.join(map(str, used)).encode('ascii')).digest()
+    name = ''.join(chr(65 + byte % 26) for byte in digest[:6])
+    name = f'{name}+{font.name}'
+    widths = ' '.join(f'{gid} [{font.widths[gid]}]' for gid in used)
+    data = _subset(font, used)
+    return {
+        FONT_ID: (
+            f'<< /Type /Font /Subtype /Type0 /BaseFont /{name} '
+            f'/Encoding /Identity-H /DescendantFonts [{FONT_ID + 1} 0 R] '
+            f'/ToUnicode {FONT_ID + 4} 0 R >>'
+        ).encode('latin-1'),
+        FONT_ID + 1: (
+            f'<< /Type /Font /Subtype /CIDFontType2 /BaseFont /{name} '
+            f'/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) '
+            f'/Supplement 0 >> /FontDescriptor {FONT_ID + 2} 0 R '
+            f'/CIDToGIDMap /Identity /DW {font.widths[0]} '
+            f'/W [{widths}] >>'
+        ).encode('latin-1'),
+        FONT_ID + 2: (
+            f'<< /Type /FontDescriptor /FontName /{name} '
+            f'{font.descriptor} /FontFile2 {FONT_ID + 3} 0 R >>'
+        ).encode('latin-1'),
+        FONT_ID + 3: _stream(f'/Length1 {len(data)}', data),
+        FONT_ID + 4: _stream('', _to_unicode(glyphs)),
+    }
+
+
+_font_lock = threading.Lock()
+_fonts: Dict[str, _Font] = {}
+
+
+def get_font() -> _Font:
+    """
+    Возвращает шрифт из SHOPPING_PDF_FONT_PATH. Файл читается
+    и разбирается один раз на процесс.
+    """
+    path = getattr(settings, 'SHOPPING_PDF_FONT_PATH', DEFAULT_FONT_PATH)
+    font = _fonts.get(path)
+    if font is None:
+        with _font_lock:
+            font = _fonts.get(path)
+            if font is None:
+                font = _fonts[path] = _load_font(path)
+    return font
+
+
+def _width(font: _Font, text: str) -> int:
+    """Ширина строки в тысячных долях кегля."""
+    return sum(map(font.advances.__getitem__, map(ord, text)))
+
+
+def _wrap(font: _Font, text: str, size: int) -> List[str]:
+    """Разбивает строку по словам, чтобы она помещалась по ширине."""
+    limit = (PAGE_WIDTH - 2 * MARGIN) * 1000 / size
+    if _width(font, text) <= limit:
+        return [text]
+    space = font.advances[32]
+    lines, current, width = [], [], 0
+    for word in text.split(' '):
+        word_width = _width(font, word)
+        if current and width + space + word_width > limit:
+            lines.append(' '.join(current))
+            current, width = [], 0
+        width += word_width + (space if current else 0)
+        current.append(word)
+    lines.append(' '.join(current))
+    return lines
+
+
+class PdfWriter:
+    """
+    Потоковая запись PDF: объекты отдаются по мере готовности,
+    смещения запоминаются для таблицы xref в конце файла.
+
+    Страницы формируются по одной, поэтому в памяти держится только
+    текущая страница. Шрифт встраивается в конце, когда известны
+    использованные символы: в файл попадают только их глифы.
+    """
+
+    def __init__(self, font: _Font):
+        """Готовит запись документа с заданным шрифтом."""
+        self.font = font
+        self.chars = set()
+        self.offsets = {}
+        self.position = 0
+        self.pages = []
+        self.next_id = FIRST_PAGE_ID
+
+    def _object(self, number: int, body: bytes) -> bytes:
+        """Оформляет объект и запоминает его смещение."""
+        chunk = b'%d 0 obj\n%s\nendobj\n' % (number, body)
+        self.offsets[number] = self.position
+        self.position += len(chunk)
+        return chunk
+
+    def _raw(self, chunk: bytes) -> bytes:
+        """Учитывает служебный фрагмент в текущей позиции."""
+        self.position += len(chunk)
+        return chunk
+
+    def header(self) -> bytes:
+        """Возвращает заголовок и каталог."""
+        return self._raw(
+            b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+        ) + self._object(
+            CATALOG_ID, b'<< /Type /Catalog /Pages %d 0 R >>' % PAGES_ID
+        )
+
+    def page(self, lines: Iterable[tuple]) -> bytes:
+        """Записывает страницу из пар (размер шрифта, строка)."""
+        commands = [
+            'BT',
+            f'{LEADING} TL',
+            f'{MARGIN} {PAGE_HEIGHT - MARGIN} Td',
+        ]
+        for size, text in lines:
+            self.chars.update(map(ord, text))
+            commands.append(
+                f'/F1 {size} Tf <{text.translate(self.font.codes)}> Tj T*'
+            )
+        commands.append('ET')
+        content_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self.pages.append(page_id)
+        return self._object(
+            content_id, _stream('', '\n'.join(commands).encode('ascii'))
+        ) + self._object(
+            page_id,
+            (
+                f'<< /Type /Page /Parent {PAGES_ID} 0 R '
+                f'/MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] '
+                f'/Resources << /Font << /F1 {FONT_ID} 0 R >> >> '
+                f'/Contents {content_id} 0 R >>'
+            ).encode('latin-1'),
+        )
+
+    def trailer(self) -> bytes:
+        """
+        Записывает подмножество шрифта, дерево страниц, таблицу xref
+        и трейлер.
+        """
+        kids = ' '.join(f'{number} 0 R' for number in self.pages)
+        chunk = b''.join(
+            self._object(number, body)
+            for number, body in sorted(
+                _font_objects(self.font, self.chars).items()
+            )
+        ) + self._object(
+            PAGES_ID,
+            (
+                f'<< /Type /Pages /Kids [{kids}] '
+                f'/Count {len(self.pages)} >>'
+            ).encode('latin-1'),
+        )
+        xref_at = self.position
+        size = self.next_id
+        rows = ['xref', f'0 {size}', '0000000000 65535 f ']
+        rows.extend(
+            f'{self.offsets[number]:010d} 00000 n '
+            for number in range(1, size)
+        )
+        rows.extend([
+            'trailer',
+            f'<< /Size {size} /Root {CATALOG_ID} 0 R >>',
+            'startxref',
+            str(xref_at),
+            '%%EOF',
+        ])
+        return chunk + ('\n'.join(rows) + '\n').encode('ascii')
+
+
+def stream_pdf(title: str, lines: Iterable[str]) -> Iterator[bytes]:
+    """
+    Возвращает PDF по частям: заголовок сразу, затем каждую страницу,
+    как только она заполнена, и в конце шрифт и таблицу xref.
+
+    Шрифт загружается до начала потока: если он недоступен, ошибка
+    возникает до отправки ответа, а не обрывает начатый файл.
+    """
+    return _pdf_chunks(get_font(), title, lines)
+
+
+def _pdf_chunks(
+    font: _Font, title: str, lines: Iterable[str]
+) -> Iterator[bytes]:
+    """Формирует части PDF для stream_pdf."""
+    writer = PdfWriter(font)
+    yield writer.header()
+
+    capacity = (PAGE_HEIGHT - 2 * MARGIN) // LEADING
+    page = [(TITLE_SIZE, title), (FONT_SIZE, '')]
+    for line in lines:
+        for part in _wrap(font, line, FONT_SIZE):
+            if len(page) >= capacity:
+                yield writer.page(page)
+                page = []
+            page.append((FONT_SIZE, part))
+    yield writer.page(page)
+    yield writer.trailer()
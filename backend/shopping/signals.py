@@ -0,0 +1,22 @@
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import ShoppingList
+from .totals import add_to_cart_totals, remove_from_cart_totals
+
+
+@receiver(post_save, sender=ShoppingList)
+def add_cart_item_totals(sender, instance, created, **kwargs):
+    """Прибавляет состав добавленного рецепта к сводному списку."""
+    if created:
+        add_to_cart_totals(instance.user_id, [instance.recipe_id])
+
+
+@receiver(pre_delete, sender=ShoppingList)
+def remove_cart_item_totals(sender, instance, **kwargs):
+    """
+    Вычитает состав рецепта из сводного списка до удаления строки
+    корзины: при каскадном удалении рецепта его ингредиенты
+    к этому моменту ещё не удалены.
+    """
+    remove_from_cart_totals(instance.user_id, [instance.recipe_id])
@@ -0,0 +1,216 @@
+from typing import Iterable, Optional
+
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+
+from recipes.models import RecipeIngredient
+from recipes.units import ingredient_unit_index
+from shopping.models import CartIngredient, ShoppingList
+
+EXPORT_CHUNK_SIZE = 500
+
+
+def _apply_recipes(
+    sign: int,
+    recipe_ids: Iterable[int],
+    user_id: Optional[int] = None,
+):
+    """
+    Прибавляет (sign=1) или вычитает (sign=-1) состав рецептов из
+    сводных списков покупок.
+
+    Затрагиваются корзины, где есть эти рецепты: только корзина
+    user_id, если он указан, иначе все. Один запрос INSERT … SELECT
+    с ON CONFLICT DO UPDATE по уникальной паре (user, ingredient),
+    после него удаляются строки с нулевым количеством. Строки
+    вставляются в порядке ключа, поэтому параллельные запросы
+    блокируют их в одном порядке и не взаимоблокируются.
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    totals = CartIngredient._meta.db_table
+    carts = ShoppingList._meta.db_table
+    items = RecipeIngredient._meta.db_table
+    params = [sign, recipe_ids]
+    user_filter = ''
+    if user_id is not None:
+        user_filter = 'AND c.user_id = %s'
+        params.append(user_id)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'''
+            INSERT INTO {totals} AS t (user_id, ingredient_id, amount)
+            SELECT c.user_id, ri.ingredient_id, %s * SUM(ri.amount)
+            FROM {carts} c
+            JOIN {items} ri ON ri.recipe_id = c.recipe_id
+            WHERE c.recipe_id = ANY(%s) {user_filter}
+            GROUP BY c.user_id, ri.ingredient_id
+            ORDER BY c.user_id, ri.ingredient_id
+            ON CONFLICT (user_id, ingredient_id)
+            DO UPDATE SET amount = t.amount + EXCLUDED.amount
+            RETURNING t.user_id
+            ''',
+            params,
+        )
+        user_ids = list({row[0] for row in cursor.fetchall()})
+        if user_ids:
+            cursor.execute(
+                f'DELETE FROM {totals} '
+                f'WHERE user_id = ANY(%s) AND amount <= 0',
+                [user_ids],
+            )
+
+
+def add_to_cart_totals(user_id: int, recipe_ids: Iterable[int]):
+    """Добавляет рецепты, уже лежащие в корзине, в сводный список."""
+    _apply_recipes(1, recipe_ids, user_id)
+
+
+def remove_from_cart_totals(user_id: int, recipe_ids: Iterable[int]):
+    """
+    Вычитает рецепты из сводного списка. Вызывается, пока строки
+    корзины ещё существуют (до их удаления).
+    """
+    _apply_recipes(-1, recipe_ids, user_id)
+
+
+def subtract_recipe_from_carts(recipe_id: int):
+    """Вычитает текущий состав рецепта из всех корзин с ним."""
+    _apply_recipes(-1, [recipe_id])
+
+
+def add_recipe_to_carts(recipe_id: int):
+    """Прибавляет текущий состав рецепта ко всем корзинам с ним."""
+    _apply_recipes(1, [recipe_id])
+
+
+def apply_cart_changes(
+    user_id: int,
+    added: Iterable[int] = (),
+    removed: Iterable[int] = (),
+):
+    """
+    Обновляет сводный список по уже выполненным изменениям корзины:
+    прибавляет состав добавленных рецептов и вычитает состав удалённых.
+
+    В отличие от add/remove_from_cart_totals корзина не читается,
+    поэтому функцию можно вызывать после DELETE … RETURNING, когда
+    строк удалённых рецептов уже нет. Как и в _apply_recipes, строки
+    блокируются в порядке ingredient_id.
+    """
+    added, removed = list(added), list(removed)
+    if not added and not removed:
+        return
+    totals = CartIngredient._meta.db_table
+    items = RecipeIngredient._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'''
+            INSERT INTO {totals} AS t (user_id, ingredient_id, amount)
+            SELECT %s, ri.ingredient_id, SUM(
+                CASE WHEN ri.recipe_id = ANY(%s)
+                THEN ri.amount ELSE -ri.amount END
+            )
+            FROM {items} ri
+            WHERE ri.recipe_id = ANY(%s)
+            GROUP BY ri.ingredient_id
+            ORDER BY ri.ingredient_id
+            ON CONFLICT (user_id, ingredient_id)
+            DO UPDATE SET amount = t.amount + EXCLUDED.amount
+            ''',
+            [user_id, added, added + removed],
+        )
+        if removed:
+            cursor.execute(
+                f'DELETE FROM {totals} WHERE user_id = %s AND amount <= 0',
+                [user_id],
+            )
+
+
+@transaction.atomic
+def rebuild_cart_totals(user_ids: Optional[Iterable[int]] = None):
+    """
+    Пересчитывает сводные списки с нуля одним INSERT … SELECT:
+    для указанных пользователей или для всех.
+    """
+    totals = CartIngredient._meta.db_table
+    carts = ShoppingList._meta.db_table
+    items = RecipeIngredient._meta.db_table
+    queryset = CartIngredient.objects.all()
+    params = []
+    user_filter = ''
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        queryset = queryset.filter(user_id__in=user_ids)
+        user_filter = 'WHERE c.user_id = ANY(%s)'
+        params.append(user_ids)
+    queryset.delete()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'''
+            INSERT INTO {totals} (user_id, ingredient_id, amount)
+            SELECT c.user_id, ri.ingredient_id, SUM(ri.amount)
+            FROM {carts} c
+            JOIN {items} ri ON ri.recipe_id = c.recipe_id
+            {user_filter}
+            GROUP BY c.user_id, ri.ingredient_id
+            ORDER BY c.user_id, ri.ingredient_id
+            ''',
+            params,
+        )
+
+
+def get_cart_totals(user_id: int):
+    """
+    Возвращает сводный список покупок пользователя, упорядоченный
+    по названию ингредиента: одно чтение по индексу (user, ingredient).
+    """
+    return [
+        {
+            'id': ingredient_id,
+            'name': name,
+            'measurement_unit': unit,
+            'amount': amount,
+        }
+        for ingredient_id, name, unit, amount in (
+            CartIngredient.objects.filter(user_id=user_id)
+            .order_by('ingredient__name', 'ingredient_id')
+            .values_list(
+                'ingredient_id',
+                'ingredient__name',
+                'ingredient__measurement_unit',
+                'amount',
+            )
+        )
+    ]
+
+
+def iter_shopping_list(user_id: int, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """
+    Возвращает список покупок для выгрузки: строки сводного списка,
+    слитые по названию и единице (г и кг, мл и л, дубли справочника),
+    в алфавитном порядке.
+
+    Сначала читаются id ингредиентов корзины и упорядочиваются по
+    группам слияния в памяти; затем строки читаются серверным курсором
+    порциями по chunk_size в этом порядке, и каждая группа отдаётся,
+    как только прочитана, не дожидаясь конца корзины.
+    """
+    data, order = ingredient_unit_index.merge_order(
+        CartIngredient.objects.filter(user_id=user_id).values_list(
+            'ingredient_id', flat=True
+        )
+    )
+    rows = (
+        CartIngredient.objects.filter(
+            user_id=user_id, ingredient_id__in=order
+        )
+        .order_by(
+            RawSQL('array_position(%s::bigint[], ingredient_id)', (order,))
+        )
+        .values_list('ingredient_id', 'amount')
+        .iterator(chunk_size=chunk_size)
+    )
+    return ingredient_unit_index.merge(rows, data, chunk_size)
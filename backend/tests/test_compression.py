@@ -0,0 +1,60 @@
+"""Сжатие ответов API."""
+import gzip
+import json
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, override_settings
+
+from core.middleware import CompressionMiddleware
+
+PAYLOAD = json.dumps([{'id': i, 'name': 'рецепт'} for i in range(200)])
+
+
+def _compress(response, encoding='gzip'):
+    """Пропускает ответ через middleware сжатия."""
+    request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=encoding)
+    return CompressionMiddleware(lambda request: response)(request)
+
+
+def _json(content=PAYLOAD):
+    """Возвращает JSON-ответ."""
+    return HttpResponse(content, content_type='application/json')
+
+
+def test_gzip_is_padded():
+    """Длина gzip-ответа меняется от случайного дополнения."""
+    sizes = set()
+    for _ in range(20):
+        response = _compress(_json())
+        assert response['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(response.content).decode() == PAYLOAD
+        sizes.add(len(response.content))
+    assert len(sizes) > 1
+
+
+def test_streaming_gzip_is_padded():
+    """Потоковые ответы тоже получают случайное дополнение."""
+    sizes = set()
+    for _ in range(20):
+        response = _compress(
+            StreamingHttpResponse(
+                iter([PAYLOAD]), content_type='application/json'
+            )
+        )
+        content = b''.join(response.streaming_content)
+        assert gzip.decompress(content).decode() == PAYLOAD
+        sizes.add(len(content))
+    assert len(sizes) > 1
+
+
+def test_html_is_not_compressed():
+    """HTML (страницы админки с CSRF-токенами) не сжимается."""
+    response = _compress(HttpResponse(PAYLOAD, content_type='text/html'))
+    assert not response.has_header('Content-Encoding')
+
+
+@override_settings(API_COMPRESSION_MIN_SIZE=1024)
+def test_small_response_is_not_compressed():
+    """Ответы меньше порога отдаются как есть."""
+    response = _compress(_json('{"auth_token": "secret"}'))
+    assert not response.has_header('Content-Encoding')
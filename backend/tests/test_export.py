@@ -0,0 +1,135 @@
+"""Выгрузка списка покупок: текстовые форматы и PDF."""
+from io import BytesIO
+
+import pytest
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.test import override_settings
+from fontTools.ttLib import TTFont
+from pypdf import PdfReader
+
+from shopping.export import (
+    EMPTY_MESSAGE,
+    CsvShoppingListRenderer,
+    MarkdownShoppingListRenderer,
+    PdfShoppingListRenderer,
+    ShoppingListRenderer,
+    TextShoppingListRenderer,
+)
+from shopping.pdf import get_font, stream_pdf
+
+ROWS = [
+    {'name': 'Сахар', 'amount': 2.3, 'measurement_unit': 'кг'},
+    {'name': 'Молоко | цельное', 'amount': 1, 'measurement_unit': 'л'},
+]
+
+
+def _text(renderer, rows, message=EMPTY_MESSAGE):
+    """Возвращает выгрузку как строку."""
+    return b''.join(renderer.stream(rows, message)).decode()
+
+
+def _pdf(lines, title='Список покупок'):
+    """Собирает PDF и разбирает его строгим парсером."""
+    return PdfReader(BytesIO(b''.join(stream_pdf(title, lines))), strict=True)
+
+
+def _embedded_font(reader):
+    """Возвращает встроенный шрифт первой страницы."""
+    font = reader.pages[0]['/Resources']['/Font']['/F1'].get_object()
+    descendant = font['/DescendantFonts'][0].get_object()
+    data = descendant['/FontDescriptor']['/FontFile2'].get_data()
+    return font, TTFont(BytesIO(data))
+
+
+def test_base_renderer_is_abstract():
+    """Рендерер без stream_text нельзя создать."""
+    with pytest.raises(TypeError):
+        ShoppingListRenderer()
+
+
+def test_text_export():
+    """Текст: по строке на ингредиент, сообщение для пустого списка."""
+    renderer = TextShoppingListRenderer()
+    assert _text(renderer, ROWS) == (
+        'Сахар: 2.3 кг\nМолоко | цельное: 1 л'
+    )
+    assert _text(renderer, []) == EMPTY_MESSAGE
+
+
+def test_csv_export():
+    """CSV: заголовок, строки; сообщение первой ячейкой без строк."""
+    renderer = CsvShoppingListRenderer()
+    assert _text(renderer, ROWS).splitlines() == [
+        'Ингредиент,Количество,Единица',
+        'Сахар,2.3,кг',
+        'Молоко | цельное,1,л',
+    ]
+    assert _text(renderer, [], 'Нужна авторизация.').splitlines() == [
+        'Ингредиент,Количество,Единица',
+        'Нужна авторизация.',
+    ]
+
+
+def test_markdown_export():
+    """Markdown: таблица с экранированными ячейками."""
+    lines = _text(MarkdownShoppingListRenderer(), ROWS).splitlines()
+    assert lines[0] == '# Список покупок'
+    assert lines[-1] == '| Молоко \\| цельное | 1 | л |'
+
+
+def test_render_error_as_message():
+    """Ответ DRF с ошибкой рендерится как сообщение в формате выгрузки."""
+    content = CsvShoppingListRenderer().render({'detail': 'Ошибка.'})
+    assert content.decode().splitlines()[-1] == 'Ошибка.'
+
+
+def test_pdf_text_and_pages():
+    """PDF разбирается строгим парсером, текст извлекается."""
+    lines = [f'Продукт № {i}: {i} г' for i in range(120)]
+    reader = _pdf(lines)
+    assert len(reader.pages) > 1
+    text = '\n'.join(page.extract_text() for page in reader.pages)
+    assert 'Список покупок' in text
+    for line in lines:
+        assert line in text
+
+
+def test_pdf_long_line_is_wrapped():
+    """Длинная строка переносится и не теряется."""
+    words = ['картофель'] * 40
+    text = _pdf([' '.join(words)]).pages[0].extract_text()
+    assert text.count('картофель') == len(words)
+
+
+def test_pdf_font_is_subset():
+    """Встраиваются только глифы использованных символов."""
+    font, embedded = _embedded_font(_pdf(['Сахар: 1 кг']))
+    assert font['/BaseFont'].split('+')[1] == get_font().name
+    glyf, order = embedded['glyf'], embedded.getGlyphOrder()
+
+    def contours(char):
+        return glyf[order[get_font().glyphs[ord(char)]]].numberOfContours
+
+    for char in 'Сахар:1кгСписокпу':
+        assert contours(char) != 0
+    assert contours('Щ') == 0
+    with open(settings.SHOPPING_PDF_FONT_PATH, 'rb') as file:
+        full_size = len(file.read())
+    assert len(embedded.reader.file.getvalue()) < full_size / 4
+
+
+def test_pdf_empty_list():
+    """Пустой список: сообщение вместо строк."""
+    content = b''.join(
+        PdfShoppingListRenderer().stream([], EMPTY_MESSAGE)
+    )
+    text = PdfReader(BytesIO(content), strict=True).pages[0].extract_text()
+    assert EMPTY_MESSAGE in text
+
+
+@override_settings(SHOPPING_PDF_FONT_PATH='/nonexistent/font.ttf')
+def test_pdf_missing_font_fails_before_streaming():
+    """Без шрифта ошибка возникает до первого байта ответа."""
+    with pytest.raises(ImproperlyConfigured):
+        stream_pdf('Список покупок', iter(['Сахар: 1 кг']))
@@ -0,0 +1,45 @@
+"""Индексы и поиск ингредиентов."""
+import pytest
+
+from recipes.ingredient_index import (
+    VersionedIngredientIndex,
+    ingredient_index,
+)
+from recipes.ingredient_search import search_ingredients_ranked
+from recipes.models import Ingredient
+
+
+@pytest.fixture
+def ingredients(db):
+    """Ингредиенты с буквами, которые casefold() меняет иначе lower()."""
+    names = ('Straße-Brot', 'Strassenmix', 'Сахар', 'сахарная пудра')
+    Ingredient.objects.bulk_create(
+        Ingredient(name=name, measurement_unit='г') for name in names
+    )
+    ingredient_index.get_data(force=True)
+
+
+@pytest.mark.parametrize(
+    'query,expected',
+    [
+        ('STRAẞE', ['Straße-Brot']),
+        ('straß', ['Straße-Brot']),
+        ('strass', ['Strassenmix']),
+        ('САХАР', ['Сахар', 'сахарная пудра']),
+    ],
+)
+def test_ranked_search_matches_prefix_index(ingredients, query, expected):
+    """Ранжированный поиск в SQL и индекс в памяти находят одно и то же."""
+    ranked = [row['name'] for row in search_ingredients_ranked(query, 10)]
+    prefix = [row['name'] for row in ingredient_index.search(query)]
+    assert sorted(ranked) == sorted(prefix) == expected
+
+
+def test_index_without_build_cannot_be_created():
+    """Индекс без build() не создаётся, а не падает на первом запросе."""
+
+    class Incomplete(VersionedIngredientIndex):
+        """Индекс без build()."""
+
+    with pytest.raises(TypeError):
+        Incomplete()
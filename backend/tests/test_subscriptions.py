@@ -0,0 +1,98 @@
+"""Признак is_subscribed в списках пользователей и рецептов."""
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+from users.models import Follow, User
+
+AUTHORS = 6
+
+
+def _user(number):
+    """Создаёт пользователя."""
+    return User.objects.create_user(
+        email=f'user{number}@example.com',
+        username=f'user{number}',
+        password='Passw0rd!!',
+        first_name='Имя',
+        last_name='Фамилия',
+    )
+
+
+@pytest.fixture
+def viewer(db):
+    """Пользователь, подписанный на авторов с чётными номерами."""
+    viewer = _user(0)
+    authors = [_user(i) for i in range(1, AUTHORS + 1)]
+    for number, author in enumerate(authors, 1):
+        Recipe.objects.create(
+            author=author,
+            name=f'Рецепт {number}',
+            text='Описание',
+            cooking_time=10,
+            image='recipes/test.png',
+        )
+        if number % 2 == 0:
+            Follow.objects.create(user=viewer, author=author)
+    return viewer
+
+
+def _client(user):
+    """Возвращает клиент API от имени пользователя."""
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def _follow_queries(ctx):
+    """Возвращает запросы к таблице подписок."""
+    table = Follow._meta.db_table
+    return [
+        query['sql'] for query in ctx.captured_queries
+        if f'FROM "{table}"' in query['sql']
+    ]
+
+
+def test_users_list_loads_page_subscriptions_once(viewer):
+    """Подписки на пользователей страницы — один запрос по их ID."""
+    with CaptureQueriesContext(connection) as ctx:
+        response = _client(viewer).get('/api/users/', {'limit': 3})
+    assert response.status_code == 200
+    results = response.json()['results']
+    assert len(results) == 3
+    for user in results:
+        assert user['is_subscribed'] == (
+            Follow.objects.filter(user=viewer, author_id=user['id']).exists()
+        )
+    (query,) = _follow_queries(ctx)
+    assert 'IN' in query
+
+
+def test_recipes_list_loads_page_subscriptions_once(viewer):
+    """Подписки на авторов рецептов страницы — один запрос по их ID."""
+    with CaptureQueriesContext(connection) as ctx:
+        response = _client(viewer).get('/api/recipes/', {'limit': 4})
+    assert response.status_code == 200
+    results = response.json()['results']
+    assert len(results) == 4
+    for recipe in results:
+        author = User.objects.get(pk=recipe['author']['id'])
+        assert recipe['author']['is_subscribed'] == (
+            int(author.username[4:]) % 2 == 0
+        )
+    (query,) = _follow_queries(ctx)
+    assert 'IN' in query
+
+
+def test_anonymous_list_skips_subscriptions(viewer):
+    """Для анонимного пользователя подписки не запрашиваются."""
+    with CaptureQueriesContext(connection) as ctx:
+        response = APIClient().get('/api/recipes/')
+    assert response.status_code == 200
+    assert all(
+        not recipe['author']['is_subscribed']
+        for recipe in response.json()['results']
+    )
+    assert not _follow_queries(ctx)
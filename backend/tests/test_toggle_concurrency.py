@@ -0,0 +1,205 @@
+"""
+Параллельные переключения избранного и списка покупок.
+
+Запросы идут из потоков с отдельными соединениями к PostgreSQL,
+поэтому тесты выполняются без оборачивающей транзакции.
+"""
+import random
+import threading
+
+import pytest
+from django.db import connection
+from rest_framework.test import APIClient
+
+from favorites.models import Favorite
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from shopping.models import CartIngredient
+from shopping.totals import rebuild_cart_totals
+from users.models import User
+
+THREADS = 6
+ROUNDS = 10
+INGREDIENTS = 40
+
+
+def _user(number):
+    """Создаёт пользователя."""
+    return User.objects.create_user(
+        email=f'user{number}@example.com',
+        username=f'user{number}',
+        password='Passw0rd!!',
+        first_name='Имя',
+        last_name='Фамилия',
+    )
+
+
+def _recipes(author, count):
+    """
+    Создаёт рецепты с пересекающимися наборами ингредиентов разного
+    размера, записанными в случайном порядке.
+    """
+    rng = random.Random(count)
+    ingredients = Ingredient.objects.bulk_create(
+        Ingredient(name=f'Ингредиент {i}', measurement_unit='г')
+        for i in range(INGREDIENTS)
+    )
+    recipes = []
+    for i in range(count):
+        recipe = Recipe.objects.create(
+            author=author,
+            name=f'Рецепт {i}',
+            text='Описание',
+            cooking_time=10,
+            image='recipes/test.png',
+        )
+        chosen = rng.sample(ingredients, rng.randint(10, INGREDIENTS))
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=item, amount=i + 1)
+            for item in chosen
+        )
+        recipes.append(recipe)
+    return recipes
+
+
+def _run_parallel(jobs):
+    """
+    Выполняет задания в потоках, начиная каждый раунд одновременно.
+    Возвращает коды всех ответов.
+    """
+    barrier = threading.Barrier(len(jobs))
+    codes = []
+    lock = threading.Lock()
+
+    def worker(job):
+        try:
+            for _ in range(ROUNDS):
+                barrier.wait()
+                for response in job():
+                    with lock:
+                        codes.append(response.status_code)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(job,)) for job in jobs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return codes
+
+
+def _client(user):
+    """Возвращает клиент API, не пробрасывающий исключения сервера."""
+    client = APIClient()
+    client.force_authenticate(user)
+    client.raise_request_exception = False
+    return client
+
+
+def _toggle(client, recipe, name):
+    """Возвращает задание: добавить рецепт в список и убрать его."""
+    url = f'/api/recipes/{recipe.pk}/{name}/'
+
+    def job():
+        return client.post(url), client.delete(url)
+
+    return job
+
+
+def _bulk_toggle(client, recipes, name):
+    """Возвращает задание: массово добавить рецепты в список и убрать."""
+    url = f'/api/recipes/{name}/bulk/'
+    data = {'ids': [recipe.pk for recipe in recipes]}
+
+    def job():
+        return (
+            client.post(url, data, format='json'),
+            client.delete(url, data, format='json'),
+        )
+
+    return job
+
+
+def _totals(user):
+    """Возвращает сводный список покупок пользователя как словарь."""
+    return dict(
+        CartIngredient.objects.filter(user=user).values_list(
+            'ingredient_id', 'amount'
+        )
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_bulk_cart_toggles_of_one_user():
+    """
+    Один пользователь параллельно добавляет и убирает пересекающиеся
+    наборы рецептов разного размера: без ошибок 500 и
+    взаимоблокировок, в конце сводный список пуст.
+    """
+    user = _user(0)
+    recipes = _recipes(user, THREADS * 2)
+    client = _client(user)
+    jobs = []
+    for i in range(THREADS):
+        chosen = recipes[i:2 * i + 2]
+        if i % 2:
+            chosen = chosen[::-1]
+        jobs.append(_bulk_toggle(client, chosen, 'shopping_cart'))
+    codes = _run_parallel(jobs)
+
+    assert set(codes) == {200}
+    assert not CartIngredient.objects.filter(user=user).exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_cart_toggles_keep_totals():
+    """
+    После параллельных переключений все рецепты остаются в списке,
+    а сводный список равен пересчитанному с нуля.
+    """
+    user = _user(0)
+    recipes = _recipes(user, THREADS)
+    client = _client(user)
+
+    def keep(recipe):
+        url = f'/api/recipes/{recipe.pk}/shopping_cart/'
+        started = threading.Event()
+
+        def job():
+            if not started.is_set():
+                started.set()
+                return (client.post(url),)
+            return client.delete(url), client.post(url)
+
+        return job
+
+    codes = _run_parallel([keep(recipe) for recipe in recipes])
+
+    assert set(codes) == {201, 204}
+    totals = _totals(user)
+    rebuild_cart_totals([user.pk])
+    assert totals == _totals(user)
+    assert totals
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_favorite_toggles_keep_counter():
+    """
+    Разные пользователи параллельно переключают избранное одних
+    и тех же рецептов: без ошибок 500, счётчики совпадают с числом
+    записей.
+    """
+    author = _user(0)
+    recipes = _recipes(author, 3)
+    jobs = []
+    for number in range(1, THREADS + 1):
+        client = _client(_user(number))
+        for recipe in recipes:
+            jobs.append(_toggle(client, recipe, 'favorite'))
+    codes = _run_parallel(jobs)
+
+    assert set(codes) == {201, 204}
+    for recipe in Recipe.objects.filter(pk__in=[r.pk for r in recipes]):
+        assert recipe.favorites_count == Favorite.objects.filter(
+            recipe=recipe
+        ).count()
@@ -0,0 +1,86 @@
+"""Оценки трендов и сортировка списка рецептов ?ordering=trending."""
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from favorites.models import Favorite
+from recipes.models import Recipe, RecipeTrend
+from recipes.trending import refresh_trending
+from users.models import User
+
+
+def _user(number):
+    """Создаёт пользователя."""
+    return User.objects.create_user(
+        email=f'user{number}@example.com',
+        username=f'user{number}',
+        password='Passw0rd!!',
+        first_name='Имя',
+        last_name='Фамилия',
+    )
+
+
+@pytest.fixture
+def recipes(db):
+    """Четыре рецепта: у трёх есть добавления в избранное."""
+    author = _user(0)
+    recipes = [
+        Recipe.objects.create(
+            author=author,
+            name=f'Рецепт {i}',
+            text='Описание',
+            cooking_time=10,
+            image='recipes/test.png',
+        )
+        for i in range(4)
+    ]
+    now = timezone.now()
+    # Рецепт 0: три добавления неделю назад, 1 — одно час назад,
+    # 2 — два добавления два часа назад, 3 — без добавлений.
+    events = [(0, 7 * 24), (0, 7 * 24), (0, 7 * 24), (1, 1), (2, 2), (2, 2)]
+    for number, (recipe, hours) in enumerate(events, 1):
+        favorite = Favorite.objects.create(
+            user=_user(number), recipe=recipes[recipe]
+        )
+        Favorite.objects.filter(pk=favorite.pk).update(
+            added_at=now - timedelta(hours=hours)
+        )
+    return recipes
+
+
+def _trending_ids():
+    """Возвращает id рецептов списка с ?ordering=trending."""
+    response = APIClient().get('/api/recipes/', {'ordering': 'trending'})
+    assert response.status_code == 200
+    return [recipe['id'] for recipe in response.json()['results']]
+
+
+def test_refresh_copies_day_score_to_recipe(recipes):
+    """Оценка за день копируется в Recipe.trending_score."""
+    assert refresh_trending() == 3
+    for trend in RecipeTrend.objects.all():
+        recipe = Recipe.objects.get(pk=trend.recipe_id)
+        assert recipe.trending_score == trend.score_day
+    assert Recipe.objects.get(pk=recipes[3].pk).trending_score is None
+
+
+def test_trending_ordering(recipes):
+    """Рецепты без оценки идут в конце, остальные — по оценке за день."""
+    refresh_trending()
+    assert _trending_ids() == [
+        recipes[2].pk, recipes[1].pk, recipes[0].pk, recipes[3].pk
+    ]
+
+
+def test_rebuild_recomputes_scores(recipes):
+    """Пересборка сбрасывает устаревшие оценки и считает те же заново."""
+    refresh_trending()
+    before = dict(Recipe.objects.values_list('id', 'trending_score'))
+    Recipe.objects.filter(pk=recipes[3].pk).update(trending_score=1e9)
+    refresh_trending(rebuild=True)
+    after = dict(Recipe.objects.values_list('id', 'trending_score'))
+    assert after[recipes[3].pk] is None
+    for recipe in recipes[:3]:
+        assert after[recipe.pk] == pytest.approx(before[recipe.pk])
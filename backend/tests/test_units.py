@@ -0,0 +1,142 @@
+"""Перевод единиц и слияние строк списка покупок."""
+import pytest
+
+from recipes.models import Ingredient
+from recipes.units import UNIT_CONVERSIONS, canonical_unit, format_amount
+from shopping.models import CartIngredient
+from shopping.totals import iter_shopping_list
+from users.models import User
+
+# Записи единиц, как их вводят в справочник, и ожидаемый перевод.
+EXPECTED_CONVERSIONS = {
+    'мг': ('г', 0.001),
+    'г': ('г', 1),
+    'гр.': ('г', 1),
+    'грамм': ('г', 1),
+    'кг': ('г', 1000),
+    'мл': ('мл', 1),
+    'л': ('мл', 1000),
+    'литр': ('мл', 1000),
+    'ч. л.': ('мл', 5),
+    'дл': ('мл', 100),
+    'ст. л.': ('мл', 15),
+    'стакан': ('мл', 200),
+    'шт.': ('шт', 1),
+    'штука': ('шт', 1),
+    'десяток': ('шт', 10),
+}
+
+
+def test_conversion_table_is_covered():
+    """Каждая единица таблицы перевода проверяется тестом ниже."""
+    assert len(UNIT_CONVERSIONS) == len(EXPECTED_CONVERSIONS)
+    assert set(UNIT_CONVERSIONS.values()) == set(
+        EXPECTED_CONVERSIONS.values()
+    )
+
+
+@pytest.mark.parametrize('unit,expected', EXPECTED_CONVERSIONS.items())
+def test_conversion_factor(unit, expected):
+    """Единица переводится в каноническую с верным множителем."""
+    assert canonical_unit(unit) == expected
+    assert canonical_unit(f' {unit.upper()} ') == expected
+
+
+def test_unknown_unit_is_kept():
+    """Неизвестная единица остаётся как есть с множителем 1."""
+    assert canonical_unit(' щепотка ') == ('щепотка', 1)
+
+
+@pytest.mark.parametrize(
+    'amount,unit,expected',
+    [
+        (999, 'г', (999, 'г')),
+        (1000, 'г', (1, 'кг')),
+        (2300, 'г', (2.3, 'кг')),
+        (1500, 'мл', (1.5, 'л')),
+        (12, 'шт', (12, 'шт')),
+        (1 / 3, 'г', (0.333, 'г')),
+    ],
+)
+def test_format_amount(amount, unit, expected):
+    """Крупная единица выбирается по порогу, сумма округляется."""
+    assert format_amount(amount, unit) == expected
+
+
+@pytest.fixture
+def user(db):
+    """Пользователь со списком покупок."""
+    return User.objects.create_user(
+        email='cook@example.com',
+        username='cook',
+        password='Passw0rd!!',
+        first_name='Имя',
+        last_name='Фамилия',
+    )
+
+
+def _cart(user, *items):
+    """Заполняет сводный список строками (название, единица, кол-во)."""
+    for name, unit, amount in items:
+        CartIngredient.objects.create(
+            user=user,
+            ingredient=Ingredient.objects.create(
+                name=name, measurement_unit=unit
+            ),
+            amount=amount,
+        )
+
+
+def test_mixed_units_are_merged(user):
+    """Строки одного продукта в разных единицах сводятся к общей."""
+    _cart(
+        user,
+        ('сахар', 'г', 300),
+        ('Сахар', 'кг', 2),
+        ('молоко', 'мл', 500),
+        ('молоко', 'л', 1),
+        ('вода', 'дл', 3),
+        ('вода', 'мл', 50),
+        ('масло', 'ст. л.', 2),
+        ('масло', 'ч. л.', 1),
+        ('яйца', 'шт.', 3),
+        ('яйца', 'десяток', 1),
+    )
+    assert list(iter_shopping_list(user.pk)) == [
+        {'name': 'вода', 'amount': 350, 'measurement_unit': 'мл'},
+        {'name': 'масло', 'amount': 35, 'measurement_unit': 'мл'},
+        {'name': 'молоко', 'amount': 1.5, 'measurement_unit': 'л'},
+        {'name': 'сахар', 'amount': 2.3, 'measurement_unit': 'кг'},
+        {'name': 'яйца', 'amount': 13, 'measurement_unit': 'шт'},
+    ]
+
+
+def test_single_unit_is_kept(user):
+    """Без смешения единиц остаётся единица из справочника."""
+    _cart(
+        user,
+        ('соль', 'ч. л.', 2),
+        ('мука', 'кг', 1),
+        ('Мука ', 'кг', 2),
+        ('перец', 'щепотка', 1),
+    )
+    assert list(iter_shopping_list(user.pk)) == [
+        {'name': 'мука', 'amount': 3, 'measurement_unit': 'кг'},
+        {'name': 'перец', 'amount': 1, 'measurement_unit': 'щепотка'},
+        {'name': 'соль', 'amount': 2, 'measurement_unit': 'ч. л.'},
+    ]
+
+
+def test_merge_spans_chunks(user):
+    """Группа, разрезанная границей порции, сливается в одну строку."""
+    _cart(
+        user,
+        ('вода', 'мл', 1),
+        ('вода', 'л', 1),
+        ('вода', 'дл', 1),
+        ('соль', 'г', 5),
+    )
+    assert list(iter_shopping_list(user.pk, chunk_size=2)) == [
+        {'name': 'вода', 'amount': 1.101, 'measurement_unit': 'л'},
+        {'name': 'соль', 'amount': 5, 'measurement_unit': 'г'},
+    ]
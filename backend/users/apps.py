@@ -7,3 +7,7 @@ class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
     verbose_name = 'Пользователи'
+
+    def ready(self):
+        """Импортирует сигналы при загрузке приложения."""
+        from . import signals  # noqa: F401
@@ -1,11 +1,96 @@
+from collections import defaultdict
+
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
 from djoser.serializers import UserSerializer as DjoserUserSerializer
 from rest_framework import serializers
 
+from core.fields import SparseFieldsMixin
 from recipes.models import Recipe
 from users.models import Follow, User
 
+SUBSCRIBED_IDS_CONTEXT_KEY = 'subscribed_author_ids'
+RECIPES_BY_AUTHOR_CONTEXT_KEY = 'recipes_by_author'
+
+
+def load_subscribed_author_ids(request, author_ids):
+    """
+    Возвращает множество ID авторов из author_ids, на которых подписан
+    текущий пользователь.
+
+    Один запрос, ограниченный переданными авторами: списочные вьюхи
+    передают авторов страницы и кладут множество в контекст по ключу
+    SUBSCRIBED_IDS_CONTEXT_KEY.
+    """
+    author_ids = set(author_ids)
+    user = getattr(request, 'user', None)
+    if not author_ids or user is None or not user.is_authenticated:
+        return frozenset()
+    return frozenset(
+        Follow.objects.filter(user=user, author_id__in=author_ids)
+        .values_list('author_id', flat=True)
+    )
+
+
+def is_subscribed_to(context, author_id):
+    """
+    Проверяет, подписан ли текущий пользователь на автора.
+
+    Берёт ответ из множества, загруженного вьюхой для всей страницы;
+    если его нет (в ответе один объект), проверяет автора отдельным
+    запросом.
+    """
+    author_ids = context.get(SUBSCRIBED_IDS_CONTEXT_KEY)
+    if author_ids is None:
+        author_ids = load_subscribed_author_ids(
+            context.get('request'), [author_id]
+        )
+    return author_id in author_ids
+
+
+def get_recipes_limit(request):
+    """
+    Возвращает значение параметра recipes_limit или None,
+    если параметр не передан или некорректен.
+    """
+    if not request:
+        return None
+    try:
+        limit = int(request.query_params.get('recipes_limit') or 0)
+    except (TypeError, ValueError):
+        return None
+    return limit if limit > 0 else None
+
+
+def get_recipes_by_author(author_ids, limit=None):
+    """
+    Загружает последние рецепты сразу для всех авторов одним запросом.
 
-class CustomUserSerializer(DjoserUserSerializer):
+    Ограничение на количество рецептов у каждого автора применяется
+    оконной функцией ROW_NUMBER() OVER (PARTITION BY author_id).
+    Возвращает словарь {author_id: [рецепты, от новых к старым]}.
+    """
+    recipes = (
+        Recipe.objects.filter(author_id__in=author_ids)
+        .only('id', 'name', 'image', 'cooking_time', 'author_id')
+        .order_by('author_id', '-id')
+    )
+    if limit:
+        recipes = recipes.annotate(
+            row_number=Window(
+                RowNumber(),
+                partition_by=F('author_id'),
+                order_by=F('id').desc(),
+            )
+        ).filter(row_number__lte=limit)
+
+    grouped = defaultdict(list)
+    for recipe in recipes:
+        grouped[recipe.author_id].append(recipe)
+    return grouped
+
+
+class CustomUserSerializer(SparseFieldsMixin, DjoserUserSerializer):
     """
     Базовый сериализатор пользователя, расширяющий Djoser и добавляющий
     поле is_subscribed и абсолютную ссылку на аватар.
@@ -33,10 +118,7 @@ class CustomUserSerializer(DjoserUserSerializer):
         """
         Возвращает True, если текущий пользователь подписан на obj.
         """
-        request = self.context.get('request')
-        if not request or request.user.is_anonymous:
-            return False
-        return Follow.objects.filter(user=request.user, author=obj).exists()
+        return is_subscribed_to(self.context, obj.pk)
 
     def get_avatar(self, obj):
         """
@@ -131,19 +213,19 @@ class SubscriptionSerializer(CustomUserSerializer):
     def get_recipes(self, obj):
         """
         Возвращает рецепты автора, ограниченные параметром recipes_limit.
+
+        Если вьюха заранее загрузила рецепты всех авторов страницы,
+        они берутся из контекста без дополнительных запросов.
         """
         request = self.context.get('request')
-        limit = None
-
-        if request:
-            try:
-                limit = int(request.query_params.get('recipes_limit') or 0)
-            except (TypeError, ValueError):
-                limit = None
-
-        queryset = obj.recipes.all().order_by('-id')
-        if limit:
-            queryset = queryset[:limit]
+        recipes_by_author = self.context.get(RECIPES_BY_AUTHOR_CONTEXT_KEY)
+        if recipes_by_author is not None:
+            queryset = recipes_by_author.get(obj.pk, [])
+        else:
+            queryset = obj.recipes.all().order_by('-id')
+            limit = get_recipes_limit(request)
+            if limit:
+                queryset = queryset[:limit]
 
         return ShortRecipeSerializer(
             queryset,
@@ -155,6 +237,9 @@ class SubscriptionSerializer(CustomUserSerializer):
         """
         Возвращает общее количество рецептов автора.
         """
+        annotated = getattr(obj, 'recipes_count', None)
+        if annotated is not None:
+            return annotated
         return obj.recipes.count()
 
 
@@ -0,0 +1,29 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.versioning import (
+    USERS_VERSION,
+    bump_version_on_commit,
+    viewer_version_name,
+)
+
+from .models import Follow, User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_users(sender, instance, update_fields=None, **kwargs):
+    """
+    Меняет версию пользователей при изменении профиля.
+    Обновление только last_login при входе ответы не меняет.
+    """
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    bump_version_on_commit(USERS_VERSION)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def bump_follower_state(sender, instance, **kwargs):
+    """Меняет версию состояния подписчика при изменении подписок."""
+    bump_version_on_commit(viewer_version_name(instance.user_id))
@@ -1,3 +1,4 @@
+from django.db.models import Count
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from drf_extra_fields.fields import Base64ImageField
@@ -6,13 +7,21 @@ from rest_framework.decorators import action
 from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 
+from core.conditional import ConditionalGetMixin
+from core.fields import FIELDS_CONTEXT_KEY, get_requested_fields
 from core.pagination import CustomPagePagination
+from core.versioning import RECIPES_VERSION, USERS_VERSION
 from users.models import Follow, User
 from users.serializers import (
+    RECIPES_BY_AUTHOR_CONTEXT_KEY,
+    SUBSCRIBED_IDS_CONTEXT_KEY,
     CustomUserCreateSerializer,
     CustomUserSerializer,
     FollowSerializer,
     SubscriptionSerializer,
+    get_recipes_by_author,
+    get_recipes_limit,
+    load_subscribed_author_ids,
 )
 
 
@@ -22,7 +31,7 @@ class _AvatarInSerializer(serializers.Serializer):
     avatar = Base64ImageField(required=True)
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(ConditionalGetMixin, UserViewSet):
     """
     ViewSet для пользователей, расширяющий Djoser:
     аватар, подписки и список подписок.
@@ -34,6 +43,8 @@ class CustomUserViewSet(UserViewSet):
     lookup_field = 'id'
     lookup_url_kwarg = 'id'
     lookup_value_regex = r'\d+'
+    etag_actions = ('list', 'retrieve', 'me', 'subscriptions')
+    etag_per_user = True
 
     def get_permissions(self):
         """
@@ -45,6 +56,56 @@ class CustomUserViewSet(UserViewSet):
             return [permissions.IsAuthenticatedOrReadOnly()]
         return super().get_permissions()
 
+    def get_serializer_context(self):
+        """
+        Добавляет в контекст поля, выбранные через ?fields= и ?omit=.
+        """
+        context = super().get_serializer_context()
+        serializer_class = self.get_serializer_class()
+        available = getattr(
+            getattr(serializer_class, 'Meta', None), 'fields', None
+        )
+        if available:
+            context[FIELDS_CONTEXT_KEY] = get_requested_fields(
+                self.request, available
+            )
+        return context
+
+    def list(self, request, *args, **kwargs):
+        """
+        Возвращает страницу пользователей; подписки на них загружаются
+        одним запросом для всей страницы.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        users = page if page is not None else list(queryset)
+        context = self.get_serializer_context()
+        context[SUBSCRIBED_IDS_CONTEXT_KEY] = load_subscribed_author_ids(
+            request, [user.pk for user in users]
+        )
+        serializer = self.get_serializer_class()(
+            users, many=True, context=context
+        )
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
+    def get_etag_versions(self):
+        """
+        Возвращает версии для ETag: подписки включают рецепты авторов.
+        """
+        if self.action == 'subscriptions':
+            return (USERS_VERSION, RECIPES_VERSION)
+        return (USERS_VERSION,)
+
+    def get_cursor_ordering(self):
+        """
+        Возвращает ключ сортировки для курсорной пагинации подписок.
+        """
+        if self.action == 'subscriptions':
+            return ('id',)
+        return None
+
     @action(
         methods=['put', 'delete'],
         detail=False,
@@ -82,18 +143,31 @@ class CustomUserViewSet(UserViewSet):
         """
         Возвращает список авторов, на которых подписан текущий пользователь.
         """
-        queryset = (
-            User.objects.filter(followers__user=request.user)
-            .distinct()
-            .order_by('id')
+        fields = get_requested_fields(
+            request, SubscriptionSerializer.Meta.fields
         )
+        queryset = User.objects.filter(followers__user=request.user)
+        if fields is None or 'recipes_count' in fields:
+            queryset = queryset.annotate(recipes_count=Count('recipes'))
+        queryset = queryset.order_by('id')
+
         page = self.paginate_queryset(queryset)
-        ctx = {'request': request}
+        authors = page if page is not None else list(queryset)
+        author_ids = [author.pk for author in authors]
+        ctx = {
+            'request': request,
+            FIELDS_CONTEXT_KEY: fields,
+            SUBSCRIBED_IDS_CONTEXT_KEY: frozenset(author_ids),
+        }
+        if fields is None or 'recipes' in fields:
+            ctx[RECIPES_BY_AUTHOR_CONTEXT_KEY] = get_recipes_by_author(
+                author_ids,
+                get_recipes_limit(request),
+            )
+        data = SubscriptionSerializer(authors, many=True, context=ctx).data
         if page is not None:
-            data = SubscriptionSerializer(page, many=True, context=ctx).data
             return self.get_paginated_response(data)
 
-        data = SubscriptionSerializer(queryset, many=True, context=ctx).data
         return Response(data, status=status.HTTP_200_OK)
 
     def _get_user_or_404(self):